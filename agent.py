@@ -1,49 +1,275 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY, OPENAI_MODEL, TOP_K_RETRIEVAL
+from llm_client import create_openai_client, create_async_openai_client
+from config import OPENAI_MODEL, TOP_K_RETRIEVAL, LTM_WRITE_BEHIND, ANSWER_CACHE_ENABLED, TRACING_ENABLED
+from config import EVAL_CONCURRENCY, LLM_CALL_TIMEOUT, LLM_CALL_DEADLINE
 from memory import ShortTermMemory, LongTermMemory, EntityExtractor
+from ltm_writer import LTMWriteBehind
+from answer_cache import AnswerCache, memory_fingerprint, retrieval_fingerprint
+from prompt_packer import PromptPacker
+from context_processing import process_context
+from tracing import Trace, start_trace, use_trace, span, traced
+from profiling import profiled
+from rate_limit import TokenBucketLimiter
+from resilience import get_resilient_caller, get_resilience_metrics
+import asyncio
 import time
 
 class Agent:
-    def __init__(self, vector_store, use_stm=True, use_ltm=True):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, vector_store, use_stm=True, use_ltm=True, write_behind=LTM_WRITE_BEHIND,
+                 use_answer_cache=ANSWER_CACHE_ENABLED, client=None, async_client=None, ltm=None,
+                 rate_limiter=None):
+        # Clients, LTM and the rate limiter can be injected so several agents, or one serving many requests, share them
+        self.client = client or create_openai_client()
+        self.async_client = async_client or create_async_openai_client()
+        self._owns_async_client = async_client is None
+        self._loop = None
         self.model = OPENAI_MODEL
         self.vector_store = vector_store
         self.use_stm = use_stm
         self.use_ltm = use_ltm
         
         self.stm = ShortTermMemory() if use_stm else None
-        self.ltm = LongTermMemory() if use_ltm else None
+        self.ltm = (ltm or LongTermMemory()) if use_ltm else None
         self.entity_extractor = EntityExtractor() if use_ltm else None
+        self.ltm_writer = LTMWriteBehind(self.ltm, self._build_ltm_updates) if use_ltm and write_behind else None
+        self.answer_cache = AnswerCache() if use_answer_cache else None
+        self.prompt_packer = PromptPacker()
+        self.rate_limiter = rate_limiter or TokenBucketLimiter()
+        self.llm_caller = get_resilient_caller("chat", timeout=LLM_CALL_TIMEOUT, deadline=LLM_CALL_DEADLINE)
     
+    @profiled("agent.answer")
     def answer(self, question, top_k=TOP_K_RETRIEVAL):
+        with start_trace("agent.answer") as trace, span("agent.answer"):
+            response = self._answer(question, top_k)
+        return self._with_trace(response, trace)
+    
+    def _answer(self, question, top_k):
         start_time = time.time()
         
-        retrieved_chunks = self.vector_store.search(question, top_k=top_k)
+        retrieved_chunks, messages, cache_key, prompt_tokens = self._prepare(question, top_k)
         
-        context = self._build_context(retrieved_chunks)
+        cached = self.answer_cache.get(**cache_key) if self.answer_cache else None
+        if cached:
+            self._record_cached_interaction(question, cached["answer"])
+            return self._cached_response(cached, retrieved_chunks, prompt_tokens, time.time() - start_time)
         
-        prompt = self._build_prompt(question, context)
+        with span("llm.generate"):
+            response = self.llm_caller.call(
+                self.client.chat.completions.create,
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )
         
-        messages = [{"role": "user", "content": prompt}]
+        answer = response.choices[0].message.content
+        
+        tokens_in = response.usage.prompt_tokens
+        tokens_out = response.usage.completion_tokens
+        
+        self._record_interaction(question, answer, retrieved_chunks)
         
-        response = self.client.chat.completions.create(
+        if self.answer_cache:
+            self.answer_cache.put(answer=answer, tokens_in=tokens_in, tokens_out=tokens_out, **cache_key)
+        
+        latency = time.time() - start_time
+        
+        return {
+            "answer": answer,
+            "retrieved_chunks": retrieved_chunks,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "cached": False
+        }
+    
+    def answer_stream(self, question, top_k=TOP_K_RETRIEVAL):
+        """
+        Streaming variant of answer().
+        
+        Yields {"type": "token", "content": ...} events as the completion arrives, then
+        a final {"type": "done", ...} event with the same fields as answer() plus
+        time-to-first-token. Memory is updated once the stream completes.
+        """
+        start_time = time.time()
+        
+        # The trace is only made active between yields so it never leaks into the caller's context
+        trace = Trace("agent.answer_stream") if TRACING_ENABLED else None
+        
+        with use_trace(trace):
+            retrieved_chunks, messages, cache_key, prompt_tokens = self._prepare(question, top_k)
+            
+            cached = self.answer_cache.get(**cache_key) if self.answer_cache else None
+            if cached:
+                self._record_cached_interaction(question, cached["answer"])
+        
+        if cached:
+            yield {"type": "token", "content": cached["answer"]}
+            
+            response = self._cached_response(cached, retrieved_chunks, prompt_tokens, time.time() - start_time)
+            yield {"type": "done", **self._with_trace(response, trace), "ttft": response["latency"]}
+            return
+        
+        llm_start = time.perf_counter()
+        
+        # Only opening the stream is retried; a duplicate stream cannot be merged, so it is never hedged
+        stream = self.llm_caller.call(
+            self.client.chat.completions.create,
+            hedge=False,
             model=self.model,
             messages=messages,
             temperature=0.7,
-            max_tokens=500
+            max_tokens=500,
+            stream=True,
+            stream_options={"include_usage": True}
         )
         
-        answer = response.choices[0].message.content
+        answer_parts = []
+        ttft = None
+        tokens_in = 0
+        tokens_out = 0
         
-        tokens_in = response.usage.prompt_tokens
-        tokens_out = response.usage.completion_tokens
+        for chunk in stream:
+            if chunk.usage:
+                tokens_in = chunk.usage.prompt_tokens
+                tokens_out = chunk.usage.completion_tokens
+            
+            if not chunk.choices:
+                continue
+            
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if ttft is None:
+                    ttft = time.time() - start_time
+                answer_parts.append(delta)
+                yield {"type": "token", "content": delta}
         
-        if self.use_stm:
-            self.stm.add_message("user", question)
-            self.stm.add_message("assistant", answer)
+        answer = "".join(answer_parts)
+        
+        if trace:
+            trace.add_span("llm.generate", llm_start, time.perf_counter())
+        
+        with use_trace(trace):
+            self._record_interaction(question, answer, retrieved_chunks)
+            
+            if self.answer_cache:
+                self.answer_cache.put(answer=answer, tokens_in=tokens_in, tokens_out=tokens_out, **cache_key)
+        
+        latency = time.time() - start_time
+        
+        yield self._with_trace({
+            "type": "done",
+            "answer": answer,
+            "retrieved_chunks": retrieved_chunks,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "ttft": ttft if ttft is not None else latency,
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "cached": False
+        }, trace)
+    
+    def answer_many(self, questions, concurrency=EVAL_CONCURRENCY, top_k=TOP_K_RETRIEVAL):
+        """
+        Answer independent questions concurrently; see aanswer_many().
+        
+        Every call runs on the agent's own event loop, kept until close(): the async
+        clients' pooled connections belong to the loop that opened them, so a new
+        loop per call would find them closed.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self.aanswer_many(questions, concurrency=concurrency, top_k=top_k))
+    
+    async def aanswer_many(self, questions, concurrency=EVAL_CONCURRENCY, top_k=TOP_K_RETRIEVAL):
+        """
+        Answer independent questions with at most `concurrency` in flight.
         
+        Each question gets its own empty STM, as if the session were reset before it,
+        and LLM calls go through the agent's request/token rate limiter. Results are
+        returned in the order of `questions`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def answer_one(question):
+            async with semaphore:
+                stm = ShortTermMemory() if self.use_stm else None
+                return await self.aanswer(question, top_k=top_k, stm=stm)
+        
+        return await asyncio.gather(*(answer_one(question) for question in questions))
+    
+    @profiled("agent.answer")
+    async def aanswer(self, question, top_k=TOP_K_RETRIEVAL, stm=None):
+        """
+        Async variant of answer().
+        
+        Retrieval and the LTM fact/entity/relation reads run concurrently, so the time
+        before the LLM call is bounded by the slowest lookup rather than their sum.
+        `stm` overrides the agent's own short-term memory for this call.
+        """
+        with start_trace("agent.aanswer") as trace, span("agent.answer"):
+            response = await self._aanswer(question, top_k, stm if stm is not None else self.stm)
+        return self._with_trace(response, trace)
+    
+    async def _aanswer(self, question, top_k, stm):
+        start_time = time.time()
+        
+        query_embedding = None
+        if self.answer_cache and self.answer_cache.use_similarity:
+            query_embedding = await self.vector_store.embedding_generator.agenerate(question)
+        
+        lookups = [self.vector_store.asearch(question, top_k=top_k, query_embedding=query_embedding)]
         if self.use_ltm:
-            self._update_ltm(question, answer, retrieved_chunks)
+            lookups.append(self._aget_ltm_sections(question))
+        
+        results = await asyncio.gather(*lookups)
+        retrieved_chunks = results[0]
+        ltm_sections = results[1] if self.use_ltm else None
+        
+        prompt, prompt_tokens = self._build_prompt(question, retrieved_chunks, ltm_sections=ltm_sections, stm=stm)
+        
+        messages = [{"role": "user", "content": prompt}]
+        
+        cache_key = self._cache_key(question, retrieved_chunks, ltm_sections, query_embedding, stm=stm)
+        
+        cached = await asyncio.to_thread(self.answer_cache.get, **cache_key) if self.answer_cache else None
+        if cached:
+            self._record_cached_interaction(question, cached["answer"], stm=stm)
+            return self._cached_response(cached, retrieved_chunks, prompt_tokens, time.time() - start_time)
+        
+        with span("llm.rate_limit"):
+            reserved_tokens = await self.rate_limiter.acquire(prompt_tokens["total"] + 500)
+        
+        # A failed call used no tokens, so its whole reservation goes back to the bucket
+        used_tokens = 0
+        try:
+            with span("llm.generate"):
+                response = await self.llm_caller.acall(
+                    self.async_client.chat.completions.create,
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=500
+                )
+            
+            answer = response.choices[0].message.content
+            
+            tokens_in = response.usage.prompt_tokens
+            tokens_out = response.usage.completion_tokens
+            used_tokens = tokens_in + tokens_out
+        finally:
+            self.rate_limiter.settle(reserved_tokens, used_tokens)
+        
+        if self.use_ltm and not self.ltm_writer:
+            # Keep SQLite writes off the event loop
+            await asyncio.to_thread(self._record_interaction, question, answer, retrieved_chunks, stm)
+        else:
+            self._record_interaction(question, answer, retrieved_chunks, stm)
+        
+        if self.answer_cache:
+            await asyncio.to_thread(
+                self.answer_cache.put, answer=answer, tokens_in=tokens_in, tokens_out=tokens_out, **cache_key
+            )
         
         latency = time.time() - start_time
         
@@ -52,58 +278,193 @@ class Agent:
             "retrieved_chunks": retrieved_chunks,
             "tokens_in": tokens_in,
             "tokens_out": tokens_out,
-            "latency": latency
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "cached": False
         }
     
+    @traced("agent.prepare")
+    def _prepare(self, question, top_k):
+        query_embedding = None
+        if self.answer_cache and self.answer_cache.use_similarity:
+            # Embedded once here so the similarity tier and retrieval share it
+            query_embedding = self.vector_store.embedding_generator.generate(question)
+        
+        retrieved_chunks = self.vector_store.search(question, top_k=top_k, query_embedding=query_embedding)
+        
+        ltm_sections = self._get_ltm_sections(question) if self.use_ltm else None
+        
+        prompt, prompt_tokens = self._build_prompt(question, retrieved_chunks, ltm_sections=ltm_sections)
+        
+        messages = [{"role": "user", "content": prompt}]
+        
+        cache_key = self._cache_key(question, retrieved_chunks, ltm_sections, query_embedding)
+        
+        return retrieved_chunks, messages, cache_key, prompt_tokens
+    
+    def _cache_key(self, question, retrieved_chunks, ltm_sections, query_embedding, stm=None):
+        stm = stm if stm is not None else self.stm
+        stm_context = stm.get_context_string() if self.use_stm else ""
+        
+        return {
+            "model": self.model,
+            "question": question,
+            "chunk_ids": [chunk["id"] for chunk in retrieved_chunks],
+            "retrieval_fingerprint": retrieval_fingerprint(
+                self.vector_store.collection_name,
+                self.vector_store.embedding_generator.model,
+                self.vector_store.embedding_generator.dimensions,
+                retrieved_chunks
+            ),
+            "memory_fingerprint": memory_fingerprint(stm_context, ltm_sections),
+            "question_embedding": query_embedding
+        }
+    
+    def _with_trace(self, response, trace):
+        response["stage_latencies"] = trace.stage_latencies() if trace else {}
+        response["trace"] = trace.to_dict() if trace else None
+        return response
+    
+    def _cached_response(self, cached, retrieved_chunks, prompt_tokens, latency):
+        return {
+            "answer": cached["answer"],
+            "retrieved_chunks": retrieved_chunks,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "cached": True,
+            "cache_tier": cached["cache_tier"]
+        }
+    
+    def _record_cached_interaction(self, question, answer, stm=None):
+        # The interaction already reached LTM when it was first answered; only the session sees it again
+        if self.use_stm:
+            stm = stm if stm is not None else self.stm
+            stm.add_message("user", question)
+            stm.add_message("assistant", answer)
+    
+    @traced("agent.record_interaction")
+    def _record_interaction(self, question, answer, retrieved_chunks, stm=None):
+        if self.use_stm:
+            stm = stm if stm is not None else self.stm
+            stm.add_message("user", question)
+            stm.add_message("assistant", answer)
+        
+        if self.use_ltm:
+            if self.ltm_writer:
+                self.ltm_writer.submit(question, answer, retrieved_chunks)
+            else:
+                self._update_ltm(question, answer, retrieved_chunks)
+    
     def _build_context(self, retrieved_chunks):
         context_parts = []
         
         for i, chunk in enumerate(retrieved_chunks):
-            source = chunk["metadata"].get("title", "Unknown")
-            context_parts.append(f"[Source {i+1}: {source}]\n{chunk['text']}")
+            context_parts.append(self._format_chunk(i, chunk))
         
         return "\n\n".join(context_parts)
     
-    def _build_prompt(self, question, rag_context):
-        prompt_parts = []
+    def _format_chunk(self, index, chunk):
+        source = chunk["metadata"].get("title", "Unknown")
+        return f"[Source {index+1}: {source}]\n{chunk['text']}"
+    
+    @traced("agent.build_prompt")
+    def _build_prompt(self, question, retrieved_chunks, ltm_sections=None, stm=None):
+        """
+        Assemble the prompt within the packer's token budget.
         
-        prompt_parts.append("You are a knowledgeable assistant specializing in unusual natural phenomena.")
+        Returns the prompt and the number of tokens each section used.
+        """
+        header = "You are a knowledgeable assistant specializing in unusual natural phenomena."
+        question_part = f"\nQuestion: {question}\n"
+        instruction = "\nProvide a clear and accurate answer based on the context provided."
         
-        if self.use_stm and self.stm.messages:
-            conversation_history = self.stm.get_context_string()
-            prompt_parts.append(f"\nConversation History:\n{conversation_history}\n")
+        sections = {}
+        stm = stm if stm is not None else self.stm
+        
+        if self.use_stm and stm.messages:
+            sections["conversation"] = {
+                "title": "\nConversation History:\n",
+                "items": self._conversation_turns(stm.messages),
+                "newest_first": True
+            }
         
         if self.use_ltm:
-            ltm_facts = self.ltm.get_facts(limit=5, min_salience=0.3)
-            if ltm_facts:
-                facts_text = "\n".join([f"- {fact['content']}" for fact in ltm_facts])
-                prompt_parts.append(f"\nRelevant Facts from Previous Sessions:\n{facts_text}\n")
+            ltm_sections = ltm_sections if ltm_sections is not None else self._get_ltm_sections(question)
             
-            entities = self.ltm.get_all_entities()
-            if entities:
-                entities_text = "\n".join([
-                    f"- {e['name']} ({e['type']})" for e in entities[:10]
-                ])
-                prompt_parts.append(f"\nKnown Entities:\n{entities_text}\n")
-            
-            # Add entity relationships to provide richer context
-            relations = self.ltm.get_entity_relations(limit=15)
-            if relations:
-                relations_text = "\n".join([
-                    f"- {r['entity1']} {r['relation_type'].replace('_', ' ')} {r['entity2']}"
-                    for r in relations
-                ])
-                prompt_parts.append(f"\nKnown Relationships:\n{relations_text}\n")
+            sections["facts"] = {"title": "\nRelevant Facts from Previous Sessions:\n", "items": ltm_sections["facts"]}
+            sections["entities"] = {"title": "\nKnown Entities:\n", "items": ltm_sections["entities"]}
+            sections["relations"] = {"title": "\nKnown Relationships:\n", "items": ltm_sections["relations"]}
+        
+        # Overlapping neighbours are merged for the prompt only; retrieved_chunks stays intact for evaluation
+        passages = process_context(retrieved_chunks)
+        
+        sections["context"] = {
+            "title": "\nRelevant Context:\n",
+            "items": [self._format_chunk(i, passage) for i, passage in enumerate(passages)]
+        }
+        
+        selected, prompt_tokens = self.prompt_packer.pack(sections, [header, question_part, instruction])
+        
+        prompt_parts = [header]
         
-        prompt_parts.append(f"\nRelevant Context:\n{rag_context}\n")
-        prompt_parts.append(f"\nQuestion: {question}\n")
-        prompt_parts.append("\nProvide a clear and accurate answer based on the context provided.")
+        if selected.get("conversation"):
+            conversation_history = "\n".join(sections["conversation"]["items"][i] for i in selected["conversation"])
+            prompt_parts.append(f"{sections['conversation']['title']}{conversation_history}\n")
         
-        return "\n".join(prompt_parts)
+        for name in ("facts", "entities", "relations"):
+            if selected.get(name):
+                section_text = "\n".join(sections[name]["items"][i] for i in selected[name])
+                prompt_parts.append(f"{sections[name]['title']}{section_text}\n")
+        
+        # The header is only paid for, and only shown, when at least one passage fits
+        if selected.get("context"):
+            rag_context = self._build_context([passages[i] for i in selected["context"]])
+            prompt_parts.append(f"{sections['context']['title']}{rag_context}\n")
+        prompt_parts.append(question_part)
+        prompt_parts.append(instruction)
+        
+        return "\n".join(prompt_parts), prompt_tokens
+    
+    def _conversation_turns(self, messages):
+        # A question and its answer are kept or dropped together
+        turns = []
+        for msg in messages:
+            line = f"{msg['role'].upper()}: {msg['content']}"
+            if msg["role"] == "user" or not turns:
+                turns.append(line)
+            else:
+                turns[-1] += f"\n{line}"
+        return turns
+    
+    @traced("ltm.question_entities")
+    def _question_entities(self, question):
+        # Only relationships around entities mentioned in the question are included
+        self.entity_extractor.sync(self.ltm)
+        return [e["name"] for e in self.entity_extractor.extract_from_text(question)]
+    
+    def _get_ltm_sections(self, question):
+        return self.ltm.get_prompt_sections(self._question_entities(question))
+    
+    async def _aget_ltm_sections(self, question):
+        question_entities = await asyncio.to_thread(self._question_entities, question)
+        return await self.ltm.aget_prompt_sections(question_entities)
     
     def _update_ltm(self, question, answer, retrieved_chunks):
+        updates = self._build_ltm_updates(question, answer, retrieved_chunks)
+        self.ltm.save_batch(
+            facts=updates["facts"],
+            entities=updates["entities"],
+            relations=updates["relations"]
+        )
+    
+    @traced("ltm.extract")
+    def _build_ltm_updates(self, question, answer, retrieved_chunks):
+        updates = {"facts": [], "entities": [], "relations": []}
+        
         if not retrieved_chunks:
-            return
+            return updates
         
         best_chunk = retrieved_chunks[0]
         source = best_chunk["metadata"].get("title", "Unknown")
@@ -111,12 +472,12 @@ class Agent:
         salience = 0.7 if len(retrieved_chunks) > 0 else 0.5
         
         fact_content = f"Q: {question[:100]}... A: {answer[:200]}..."
-        self.ltm.save_fact(
-            content=fact_content,
-            source=source,
-            salience=salience,
-            success_outcome=True
-        )
+        updates["facts"].append({
+            "content": fact_content,
+            "source": source,
+            "salience": salience,
+            "success_outcome": True
+        })
         
         # Extract entities from question, answer, and retrieved chunks
         combined_text = question + " " + answer
@@ -124,29 +485,59 @@ class Agent:
         if retrieved_chunks:
             combined_text += " " + retrieved_chunks[0]["text"][:500]
         
+        self.entity_extractor.sync(self.ltm)
         entities = self.entity_extractor.extract_from_text(combined_text)
+        updates["entities"] = entities
         
-        # Save all entities first
-        for entity in entities:
-            self.ltm.save_entity(
-                name=entity["name"],
-                entity_type=entity["type"],
-                attributes=entity["attributes"]
-            )
-        
-        # Extract and save relationships
+        # Extract relationships; a fact about each one is saved once both entities exist
         relationships = self.entity_extractor.extract_relationships(combined_text, entities)
         
         for entity1_name, entity2_name, relation_type in relationships:
-            relation_id = self.ltm.save_relation(entity1_name, entity2_name, relation_type)
-            if relation_id:
-                # Optionally save a fact about this relationship
-                self.ltm.save_fact(
-                    content=f"{entity1_name} {relation_type} {entity2_name}",
-                    source=source,
-                    salience=0.6,
-                    success_outcome=True
-                )
+            updates["relations"].append({
+                "entity1": entity1_name,
+                "entity2": entity2_name,
+                "relation_type": relation_type,
+                "fact": {
+                    "content": f"{entity1_name} {relation_type} {entity2_name}",
+                    "source": source,
+                    "salience": 0.6,
+                    "success_outcome": True
+                }
+            })
+        
+        return updates
+    
+    def flush(self):
+        if self.ltm_writer:
+            self.ltm_writer.flush()
+    
+    def close(self):
+        if self.ltm_writer:
+            self.ltm_writer.close()
+        
+        if self._loop is not None:
+            if self._owns_async_client:
+                self._loop.run_until_complete(self.async_client.close())
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+            self._loop.close()
+            self._loop = None
+    
+    def get_write_behind_metrics(self):
+        if self.ltm_writer:
+            return self.ltm_writer.get_metrics()
+        return {}
+    
+    def get_rate_limit_metrics(self):
+        return self.rate_limiter.get_metrics()
+    
+    def get_resilience_metrics(self):
+        """Retry, timeout, hedge and circuit state for the chat and embedding upstreams."""
+        return get_resilience_metrics()
+    
+    def get_answer_cache_stats(self):
+        if self.answer_cache:
+            return self.answer_cache.stats()
+        return {}
     
     def reset_session(self):
         if self.stm:
@@ -159,12 +550,10 @@ class Agent:
     
     def get_ltm_stats(self):
         if self.ltm:
-            facts = self.ltm.get_facts(limit=100)
-            entities = self.ltm.get_all_entities()
-            relations = self.ltm.get_entity_relations(limit=100)
+            counts = self.ltm.get_counts()
             return {
-                "total_facts": len(facts),
-                "total_entities": len(entities),
-                "total_relations": len(relations)
+                "total_facts": counts["facts"],
+                "total_entities": counts["entities"],
+                "total_relations": counts["entity_relations"]
             }
         return {"total_facts": 0, "total_entities": 0, "total_relations": 0}
\ No newline at end of file
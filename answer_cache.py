@@ -0,0 +1,204 @@
+import sqlite3
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from tracing import traced
+from config import (
+    ANSWER_CACHE_PATH, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_SIMILARITY_THRESHOLD
+)
+
+class AnswerCache:
+    """
+    Persistent cache of LLM answers.
+    
+    Entries are keyed on the normalized question, the retrieved chunk IDs, a
+    fingerprint of the retrieval (collection, embedding model and chunk texts)
+    and a fingerprint of the memory sections in the prompt. The optional
+    similarity tier also serves paraphrased questions asked against the same
+    chunks and memory state when their embeddings are close enough.
+    """
+    
+    def __init__(self, db_path=ANSWER_CACHE_PATH, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES, use_similarity=ANSWER_CACHE_SIMILARITY,
+                 similarity_threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.use_similarity = use_similarity
+        self.similarity_threshold = similarity_threshold
+        
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+        
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._init_db()
+    
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                context_key TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB,
+                answer TEXT NOT NULL,
+                tokens_in INTEGER,
+                tokens_out INTEGER,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_context ON answers(context_key)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_access ON answers(last_access)")
+        
+        conn.commit()
+        conn.close()
+    
+    @traced("answer_cache.get")
+    def get(self, model, question, chunk_ids, retrieval_fingerprint, memory_fingerprint, question_embedding=None):
+        key, context_key = self._keys(model, question, chunk_ids, retrieval_fingerprint, memory_fingerprint)
+        now = time.time()
+        
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT key, answer, tokens_in, tokens_out
+                    FROM answers
+                    WHERE key = ? AND created_at >= ?
+                """, (key, now - self.ttl_seconds))
+                row = cursor.fetchone()
+                tier = "exact" if row else None
+                
+                if row is None and self.use_similarity and question_embedding is not None:
+                    row = self._most_similar(cursor, context_key, question_embedding, now)
+                    tier = "similar" if row else None
+                
+                if row:
+                    cursor.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, row[0]))
+                    conn.commit()
+                    self._stats[f"{tier}_hits"] += 1
+                else:
+                    self._stats["misses"] += 1
+            finally:
+                conn.close()
+        
+        if not row:
+            return None
+        
+        return {
+            "answer": row[1],
+            "tokens_in": row[2],
+            "tokens_out": row[3],
+            "cache_tier": tier
+        }
+    
+    @traced("answer_cache.put")
+    def put(self, model, question, chunk_ids, retrieval_fingerprint, memory_fingerprint, answer, tokens_in, tokens_out,
+            question_embedding=None):
+        key, context_key = self._keys(model, question, chunk_ids, retrieval_fingerprint, memory_fingerprint)
+        now = time.time()
+        
+        embedding_blob = None
+        if question_embedding is not None:
+            embedding_blob = np.asarray(question_embedding, dtype=np.float32).tobytes()
+        
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT OR REPLACE INTO answers
+                    (key, context_key, question, embedding, answer, tokens_in, tokens_out, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (key, context_key, question, embedding_blob, answer, tokens_in, tokens_out, now, now))
+                
+                self._evict(cursor, now)
+                
+                conn.commit()
+            finally:
+                conn.close()
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        
+        lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (stats["exact_hits"] + stats["similar_hits"]) / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute("DELETE FROM answers")
+                conn.commit()
+            finally:
+                conn.close()
+    
+    def _most_similar(self, cursor, context_key, question_embedding, now):
+        cursor.execute("""
+            SELECT key, answer, tokens_in, tokens_out, embedding
+            FROM answers
+            WHERE context_key = ? AND created_at >= ? AND embedding IS NOT NULL
+        """, (context_key, now - self.ttl_seconds))
+        query = np.asarray(question_embedding, dtype=np.float32)
+        # Entries embedded with a different model or dimension cannot be compared
+        rows = [row for row in cursor.fetchall() if len(row[4]) == query.nbytes]
+        
+        if not rows:
+            return None
+        
+        candidates = np.stack([np.frombuffer(row[4], dtype=np.float32) for row in rows])
+        
+        norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(query)
+        similarities = candidates @ query / np.maximum(norms, 1e-12)
+        
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return rows[best][:4]
+    
+    def _evict(self, cursor, now):
+        cursor.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+        
+        # Least recently used entries go first once the cache is over capacity
+        cursor.execute("""
+            DELETE FROM answers
+            WHERE key IN (
+                SELECT key FROM answers
+                ORDER BY last_access ASC
+                LIMIT MAX((SELECT COUNT(*) FROM answers) - ?, 0)
+            )
+        """, (self.max_entries,))
+    
+    def _keys(self, model, question, chunk_ids, retrieval_fingerprint, memory_fingerprint):
+        context_key = _hash([model, list(chunk_ids), retrieval_fingerprint, memory_fingerprint])
+        key = _hash([normalize_question(question), context_key])
+        return key, context_key
+
+def normalize_question(question):
+    question = re.sub(r'\s+', ' ', question.strip().lower())
+    return question.rstrip('?!. ')
+
+def retrieval_fingerprint(collection_name, embedding_model, dimensions, retrieved_chunks):
+    # Chunk IDs are positions in the corpus, so the texts are hashed too in case the corpus changed under them
+    return _hash([collection_name, embedding_model, dimensions, [chunk["text"] for chunk in retrieved_chunks]])
+
+def memory_fingerprint(stm_context, ltm_sections):
+    return _hash([stm_context or "", ltm_sections or {}])
+
+def _hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
\ No newline at end of file
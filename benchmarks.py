@@ -0,0 +1,299 @@
+import gc
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+import tracemalloc
+from chunking import TextChunker
+from memory import ShortTermMemory, LongTermMemory, EntityExtractor
+from vector_store import VectorStore
+from embeddings import EmbeddingGenerator
+from data_ingestion import load_corpus
+from llm_client import get_standin_transport
+from openai_standin import hash_embedding
+from config import (
+    CHUNK_CONFIGS, EMBEDDING_CONFIGS, BENCHMARK_SCALES, BENCHMARK_REPEATS, BENCHMARK_REGRESSION_THRESHOLD,
+    BENCHMARK_DIR, EXPERIMENT_SEED
+)
+
+BASELINE_FILE = "baseline.json"
+LATEST_FILE = "latest.json"
+
+def synthetic_corpus(scale, seed=EXPERIMENT_SEED):
+    """`scale` times as many articles as the real corpus, each of average length, built from its shuffled sentences."""
+    corpus = load_corpus()
+    rng = random.Random(seed)
+    
+    sentences = [s for article in corpus for s in re.split(r'(?<=[.!?])\s+', article["content"]) if s.strip()]
+    target_chars = sum(len(article["content"]) for article in corpus) // len(corpus)
+    
+    articles = []
+    for i in range(len(corpus) * scale):
+        parts = []
+        length = 0
+        while length < target_chars:
+            sentence = rng.choice(sentences)
+            parts.append(sentence)
+            length += len(sentence) + 1
+            # Keep paragraph breaks so recursive chunking has separators to split on
+            if rng.random() < 0.15:
+                parts.append("\n\n")
+        
+        source = corpus[i % len(corpus)]
+        articles.append({
+            "title": f"{source['title']} {i}",
+            "url": source["url"],
+            "content": " ".join(parts)
+        })
+    return articles
+
+def synthetic_conversation(corpus, turns, seed=EXPERIMENT_SEED):
+    rng = random.Random(seed)
+    sentences = [s for article in corpus for s in re.split(r'(?<=[.!?])\s+', article["content"]) if s.strip()]
+    
+    messages = []
+    for _ in range(turns):
+        messages.append(("user", rng.choice(sentences)))
+        messages.append(("assistant", " ".join(rng.choice(sentences) for _ in range(4))))
+    return messages
+
+def synthetic_ltm_records(scale, seed=EXPERIMENT_SEED):
+    """Facts, entities and relations at `scale` times the size of a typical experiment LTM."""
+    rng = random.Random(seed)
+    entity_types = ["phenomenon", "location", "person"]
+    
+    entities = [
+        {"name": f"Entity {i}", "type": rng.choice(entity_types), "attributes": {}}
+        for i in range(300 * scale)
+    ]
+    relations = [
+        {
+            "entity1": rng.choice(entities)["name"],
+            "entity2": rng.choice(entities)["name"],
+            "relation_type": rng.choice(["occurs_in", "studied"])
+        }
+        for _ in range(400 * scale)
+    ]
+    facts = [
+        {
+            "content": f"Q: Question {i} about {rng.choice(entities)['name']}\nA: Answer {i}",
+            "source": "benchmark",
+            "salience": rng.random(),
+            "success_outcome": True
+        }
+        for i in range(100 * scale)
+    ]
+    return facts, entities, relations
+
+class BenchmarkSuite:
+    """
+    Times the CPU-side hot paths on synthetic data at several scales.
+    
+    Scale 1 matches the size of today's corpus, a typical conversation and an
+    experiment's LTM. Each benchmark runs `repeats` times for its timing and once
+    more under tracemalloc for peak Python memory (allocations made inside
+    Chroma's native code are not seen). Embeddings come from the in-process
+    stand-in with its latency turned off, so nothing leaves the machine.
+    """
+    
+    def __init__(self, scales=BENCHMARK_SCALES, repeats=BENCHMARK_REPEATS):
+        self.scales = scales
+        self.repeats = repeats
+        
+        transport = get_standin_transport()
+        transport.latency_scale = 0.0
+        transport.rate_limit_probability = 0.0
+    
+    def run(self):
+        results = {}
+        for scale in self.scales:
+            print(f"\nScale {scale}x")
+            for name, result in self._run_scale(scale):
+                results[f"{name}@{scale}x"] = result
+                print(f"  {name:<18} {result['median_seconds'] * 1000:>10.2f} ms  "
+                      f"{result['items'] / result['median_seconds']:>12.0f} items/s  "
+                      f"peak {result['peak_bytes'] / 1e6:>8.2f} MB")
+        return results
+    
+    def _run_scale(self, scale):
+        corpus = synthetic_corpus(scale)
+        repeats = self.repeats if scale < 100 else 1
+        
+        fixed_chunker = self._chunker("small_fixed")
+        recursive_chunker = self._chunker("recursive")
+        yield "chunk_fixed", self._measure(lambda: _chunk_all(fixed_chunker, corpus), len(corpus), repeats)
+        yield "chunk_recursive", self._measure(lambda: _chunk_all(recursive_chunker, corpus), len(corpus), repeats)
+        
+        conversation = synthetic_conversation(corpus, 10 * scale)
+        yield "stm_add_trim", self._measure(lambda: _replay_conversation(conversation), len(conversation), repeats)
+        
+        texts = [chunk["text"] for chunk in _chunk_all(fixed_chunker, corpus)]
+        extractor = EntityExtractor()
+        yield "entity_extract", self._measure(
+            lambda: [extractor.extract_from_text(text) for text in texts], len(texts), repeats
+        )
+        
+        entities = [extractor.extract_from_text(text) for text in texts]
+        yield "relation_extract", self._measure(
+            lambda: [extractor.extract_relationships(text, found) for text, found in zip(texts, entities)],
+            len(texts), repeats
+        )
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            facts, ltm_entities, relations = synthetic_ltm_records(scale)
+            records = len(facts) + len(ltm_entities) + len(relations)
+            
+            def write_ltm():
+                path = os.path.join(tmp_dir, f"write_{time.perf_counter_ns()}.db")
+                LongTermMemory(path).save_batch(facts=facts, entities=ltm_entities, relations=relations)
+            
+            yield "ltm_write", self._measure(write_ltm, records, repeats)
+            
+            ltm = LongTermMemory(os.path.join(tmp_dir, "read.db"))
+            ltm.save_batch(facts=facts, entities=ltm_entities, relations=relations)
+            rng = random.Random(EXPERIMENT_SEED)
+            seeds = [[rng.choice(ltm_entities)["name"] for _ in range(2)] for _ in range(100)]
+            
+            def read_ltm():
+                for names in seeds:
+                    ltm.get_facts(limit=5, min_salience=0.3)
+                    ltm.get_entities(limit=10)
+                    ltm.get_related_relations(names)
+            
+            ltm.get_graph()
+            yield "ltm_read", self._measure(read_ltm, len(seeds), repeats)
+            
+            def load_graph():
+                ltm.invalidate_graph()
+                ltm.get_graph()
+            
+            yield "ltm_graph_load", self._measure(load_graph, len(ltm_entities) + len(relations), repeats)
+            
+            vector_store = self._vector_store(tmp_dir, texts)
+            queries = [text[:200] for text in random.Random(EXPERIMENT_SEED).sample(texts, min(100, len(texts)))]
+            yield "vector_search", self._measure(
+                lambda: [vector_store.search(query, top_k=5) for query in queries], len(queries), repeats
+            )
+    
+    def _measure(self, func, items, repeats):
+        timings = []
+        for _ in range(repeats):
+            gc.collect()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        return {
+            "items": items,
+            "repeats": repeats,
+            "median_seconds": statistics.median(timings),
+            "min_seconds": min(timings),
+            "peak_bytes": peak_bytes
+        }
+    
+    def _chunker(self, name):
+        config = CHUNK_CONFIGS[name]
+        return TextChunker(strategy=config["strategy"], chunk_size=config["size"], overlap=config["overlap"])
+    
+    def _vector_store(self, tmp_dir, texts):
+        embedding_config = EMBEDDING_CONFIGS["small"]
+        generator = EmbeddingGenerator(
+            model=embedding_config["model"],
+            dimensions=embedding_config["dimensions"],
+            backend="standin"
+        )
+        vector_store = VectorStore("benchmark", os.path.join(tmp_dir, "chroma"), embedding_config,
+                                   embedding_generator=generator)
+        
+        # Index with the stand-in's vectors directly; only search goes through the embedding client
+        batch_size = 5000
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            vector_store.collection.add(
+                ids=[f"chunk_{start + i}" for i in range(len(batch))],
+                documents=batch,
+                embeddings=[
+                    hash_embedding(text, embedding_config["model"], embedding_config["dimensions"]).tolist()
+                    for text in batch
+                ]
+            )
+        return vector_store
+
+def compare_to_baseline(results, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD):
+    """Benchmarks whose median time or peak memory grew by more than `threshold` over the baseline."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        
+        for metric in ("median_seconds", "peak_bytes"):
+            if reference[metric] and result[metric] > reference[metric] * (1 + threshold):
+                regressions.append({
+                    "benchmark": key,
+                    "metric": metric,
+                    "baseline": reference[metric],
+                    "current": result[metric],
+                    "change": result[metric] / reference[metric] - 1
+                })
+    return regressions
+
+def run_benchmarks(scales=BENCHMARK_SCALES, save_baseline=False, threshold=BENCHMARK_REGRESSION_THRESHOLD):
+    """Run the suite, write the results, and either save them as the baseline or report regressions against it."""
+    results = BenchmarkSuite(scales=scales).run()
+    
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(os.path.join(BENCHMARK_DIR, LATEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    
+    baseline_path = os.path.join(BENCHMARK_DIR, BASELINE_FILE)
+    if save_baseline:
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path}")
+        return []
+    
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return []
+    
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        regressions = compare_to_baseline(results, json.load(f), threshold)
+    
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression['benchmark']} {regression['metric']}: "
+                  f"{regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['change']:+.0%})")
+    else:
+        print(f"\nNo regressions beyond {threshold:.0%} against {baseline_path}")
+    return regressions
+
+def _chunk_all(chunker, corpus):
+    chunks = []
+    for article in corpus:
+        chunks.extend(chunker.chunk(article["content"], {"title": article["title"], "url": article["url"]}))
+    return chunks
+
+def _replay_conversation(conversation):
+    stm = ShortTermMemory()
+    for role, content in conversation:
+        stm.add_message(role, content)
+    return stm
\ No newline at end of file
@@ -1,3 +1,4 @@
+import hashlib
 import tiktoken
 
 class TextChunker:
@@ -126,4 +127,12 @@ class TextChunker:
             })
             chunk_id += 1
         
-        return chunk_id
\ No newline at end of file
+        return chunk_id
+
+def chunks_hash(texts):
+    """Short hash of chunk texts in order; chunk IDs are positions, so it identifies the IDs' contents too."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
\ No newline at end of file
@@ -5,6 +5,7 @@ load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
+OPENAI_BACKEND = os.getenv("OPENAI_BACKEND", "openai")
 INPUT_COST_PER_1K = float(os.getenv("INPUT_COST_PER_1K", "0.0025"))
 OUTPUT_COST_PER_1K = float(os.getenv("OUTPUT_COST_PER_1K", "0.01"))
 
@@ -25,6 +26,14 @@ WIKIPEDIA_TOPICS = [
     "Sailing stones"
 ]
 
+WIKI_BACKEND = os.getenv("WIKI_BACKEND", "wikipedia")
+WIKI_STANDIN_DIR = os.getenv("WIKI_STANDIN_DIR", "./data/wiki_standin")
+WIKI_API_URL = os.getenv("WIKI_API_URL", "https://en.wikipedia.org/w/api.php")
+WIKI_USER_AGENT = "unusual-phenomena-rag/1.0 (corpus fetcher)"
+WIKI_REQUEST_TIMEOUT = 30
+WIKI_REVISION_BATCH = 50
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+
 SECTIONS_TO_REMOVE = [
     "References",
     "See also",
@@ -37,12 +46,123 @@ SECTIONS_TO_REMOVE = [
 
 VECTOR_STORE_DIR = "./data/vector_store"
 CORPUS_DIR = "./data/corpus"
+CORPUS_MANIFEST_PATH = "./data/corpus_manifest.json"
+CORPUS_CHANGES_PATH = "./data/corpus_changes.json"
 LTM_DB_PATH = "./data/ltm.db"
 RESULTS_DIR = "./results"
+TRACE_DIR = "./results/traces"
+PROFILE_DIR = "./results/profiles"
 
 STM_TOKEN_BUDGET = 2000
 TOP_K_RETRIEVAL = 3
 
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+PROMPT_SECTION_WEIGHTS = {
+    "context": 1.0,
+    "conversation": 0.6,
+    "facts": 0.5,
+    "relations": 0.4,
+    "entities": 0.3
+}
+PROMPT_RANK_DECAY = 0.85
+
+CONTEXT_DEDUP_SIMILARITY = 0.8
+CONTEXT_SHINGLE_SIZE = 3
+
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "30000"))
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "4"))
+SIMILARITY_MODEL = "all-MiniLM-L6-v2"
+SIMILARITY_BATCH_SIZE = 64
+
+LLM_CALL_TIMEOUT = 60
+LLM_CALL_DEADLINE = 180
+EMBEDDING_CALL_TIMEOUT = 20
+EMBEDDING_CALL_DEADLINE = 90
+RESILIENCE_MAX_ATTEMPTS = 4
+RESILIENCE_BASE_DELAY = 0.5
+RESILIENCE_MAX_DELAY = 20
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 95
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30
+
+STANDIN_BASE_URL = "http://openai-standin.local/v1"
+STANDIN_SEED = 1234
+STANDIN_LATENCY_SCALE = float(os.getenv("STANDIN_LATENCY_SCALE", "1.0"))
+STANDIN_LATENCY_SIGMA = 0.5
+STANDIN_EMBEDDING_LATENCY_MS = 30
+STANDIN_CHAT_TTFT_MS = 300
+STANDIN_CHAT_TOKEN_MS = 10
+STANDIN_RATE_LIMIT_PROBABILITY = float(os.getenv("STANDIN_RATE_LIMIT_PROBABILITY", "0.0"))
+STANDIN_RETRY_AFTER_SECONDS = 1
+
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_MAX_CONCURRENCY = 32
+SERVE_MAX_SESSIONS = 1000
+SERVE_LTM_POOL_SIZE = 8
+SERVE_CHUNK_CONFIG = "large_fixed"
+SERVE_EMBEDDING_CONFIG = "small"
+SERVE_METRICS_WINDOW = 1000
+SERVE_MAX_BODY_BYTES = 1024 * 1024
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_EXPORT_FORMAT = os.getenv("TRACE_EXPORT_FORMAT", "")
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sampling")
+PROFILING_SAMPLE_INTERVAL = 0.005
+PROFILING_MEMORY = os.getenv("PROFILING_MEMORY", "true").lower() == "true"
+PROFILING_TRACEMALLOC_FRAMES = 1
+PROFILING_TOP_ALLOCATIONS = 25
+PROFILING_TOP_FUNCTIONS = 40
+
+LTM_SALIENCE_HALF_LIFE_DAYS = 90
+LTM_MIN_SALIENCE = 0.05
+LTM_DEDUP_SIMILARITY = 0.85
+LTM_MAX_FACTS = 5000
+LTM_MAX_ENTITIES = 5000
+LTM_MAX_RELATIONS = 10000
+LTM_CONSOLIDATION_INTERVAL = 3600
+
+LTM_WRITE_BEHIND = os.getenv("LTM_WRITE_BEHIND", "false").lower() == "true"
+LTM_WRITE_BATCH_SIZE = 32
+LTM_WRITE_MAX_WAIT = 0.05
+LTM_WRITE_MAX_ATTEMPTS = 3
+
+GRAPH_TRAVERSAL_HOPS = 2
+GRAPH_CONTEXT_LIMIT = 15
+RELATION_WINDOW_CHARS = 300
+
+PREBUILD_ENTITY_GRAPH = os.getenv("PREBUILD_ENTITY_GRAPH", "false").lower() == "true"
+GRAPH_PREBUILD_WORKERS = os.cpu_count()
+GRAPH_PREBUILD_BATCH_SIZE = 64
+
+EXPERIMENT_WORKERS = int(os.getenv("EXPERIMENT_WORKERS", "4"))
+EXPERIMENT_LTM_DIR = "./data/experiment_ltm"
+RESULTS_LOG_PATH = "./results/experiment_log.jsonl"
+RESULTS_CHECKPOINT_BATCH = 8
+RETRIEVAL_BENCH_MAX_K = 20
+
+BENCHMARK_SCALES = [1, 10, 100]
+BENCHMARK_REPEATS = 5
+BENCHMARK_REGRESSION_THRESHOLD = 0.2
+BENCHMARK_DIR = "./results/benchmarks"
+
+LOAD_TEST_RATE = 4.0
+LOAD_TEST_DURATION = 30
+LOAD_TEST_CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32]
+LOAD_TEST_SATURATION_TOLERANCE = 0.1
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_PATH = "./data/answer_cache.db"
+ANSWER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+ANSWER_CACHE_MAX_ENTRIES = 10000
+ANSWER_CACHE_SIMILARITY = os.getenv("ANSWER_CACHE_SIMILARITY", "false").lower() == "true"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+
 CHUNK_CONFIGS = {
     "small_fixed": {"strategy": "fixed", "size": 256, "overlap": 50},
     "large_fixed": {"strategy": "fixed", "size": 1024, "overlap": 100},
@@ -0,0 +1,243 @@
+import sqlite3
+import re
+import time
+import threading
+from datetime import datetime
+from config import (
+    LTM_SALIENCE_HALF_LIFE_DAYS, LTM_MIN_SALIENCE, LTM_DEDUP_SIMILARITY,
+    LTM_MAX_FACTS, LTM_MAX_ENTITIES, LTM_MAX_RELATIONS, LTM_CONSOLIDATION_INTERVAL
+)
+
+class LTMConsolidator:
+    """
+    Periodic maintenance pass over the LTM database.
+    
+    Decays fact salience with a half-life, merges duplicate facts and relation
+    edges, and evicts the lowest-value rows once a table exceeds its size cap.
+    """
+    
+    def __init__(self, ltm, half_life_days=LTM_SALIENCE_HALF_LIFE_DAYS, min_salience=LTM_MIN_SALIENCE,
+                 similarity_threshold=LTM_DEDUP_SIMILARITY, max_facts=LTM_MAX_FACTS,
+                 max_entities=LTM_MAX_ENTITIES, max_relations=LTM_MAX_RELATIONS):
+        self.ltm = ltm
+        self.half_life_days = half_life_days
+        self.min_salience = min_salience
+        self.similarity_threshold = similarity_threshold
+        self.max_facts = max_facts
+        self.max_entities = max_entities
+        self.max_relations = max_relations
+        
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def run(self, vacuum=True):
+        start_time = time.time()
+        now = datetime.now()
+        
+        conn = sqlite3.connect(self.ltm.db_path)
+        cursor = conn.cursor()
+        
+        rows_before = self._count_rows(cursor)
+        
+        report = {
+            "facts_decayed": self._decay_salience(cursor, now),
+            "facts_expired": self._expire_facts(cursor),
+            "facts_merged": self._merge_facts(cursor),
+            "relations_merged": self._merge_relations(cursor),
+            "facts_evicted": self._evict_facts(cursor),
+            "entities_evicted": self._evict_entities(cursor),
+            "relations_evicted": self._evict_relations(cursor)
+        }
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO ltm_meta (key, value) VALUES ('last_consolidation', ?)
+        """, (now.isoformat(),))
+        
+        conn.commit()
+        
+        rows_after = self._count_rows(cursor)
+        report["rows_reclaimed"] = sum(rows_before.values()) - sum(rows_after.values())
+        report["rows_remaining"] = rows_after
+        
+        if vacuum and report["rows_reclaimed"] > 0:
+            conn.execute("VACUUM")
+        
+        conn.close()
+        
+        # Merged and evicted rows invalidate the in-memory graph and cached prompt sections
+        self.ltm.mark_modified()
+        
+        report["elapsed_seconds"] = time.time() - start_time
+        return report
+    
+    def start_background(self, interval=LTM_CONSOLIDATION_INTERVAL):
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._background_loop, args=(interval,), daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def _background_loop(self, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                report = self.run()
+                print(f"LTM consolidation reclaimed {report['rows_reclaimed']} rows "
+                      f"in {report['elapsed_seconds']:.3f}s")
+            except Exception as e:
+                print(f"Error during LTM consolidation: {e}")
+    
+    def _count_rows(self, cursor):
+        counts = {}
+        for table in ["facts", "entities", "entity_relations"]:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        return counts
+    
+    def _decay_salience(self, cursor, now):
+        cursor.execute("SELECT value FROM ltm_meta WHERE key = 'last_consolidation'")
+        row = cursor.fetchone()
+        last_run = datetime.fromisoformat(row[0]) if row else None
+        
+        cursor.execute("SELECT id, salience, timestamp FROM facts")
+        
+        updates = []
+        for fact_id, salience, timestamp in cursor.fetchall():
+            # Facts only decay for the time elapsed since they were last decayed
+            decay_from = datetime.fromisoformat(timestamp)
+            if last_run and last_run > decay_from:
+                decay_from = last_run
+            
+            elapsed_days = (now - decay_from).total_seconds() / 86400
+            if elapsed_days <= 0:
+                continue
+            
+            factor = 0.5 ** (elapsed_days / self.half_life_days)
+            updates.append((salience * factor, fact_id))
+        
+        cursor.executemany("UPDATE facts SET salience = ? WHERE id = ?", updates)
+        return len(updates)
+    
+    def _expire_facts(self, cursor):
+        cursor.execute("DELETE FROM facts WHERE salience < ?", (self.min_salience,))
+        return cursor.rowcount
+    
+    def _merge_facts(self, cursor):
+        cursor.execute("""
+            SELECT id, content, source, salience, timestamp, success_outcome
+            FROM facts
+            ORDER BY timestamp DESC
+        """)
+        
+        # Only facts from the same source are compared for near-duplicates
+        groups_by_source = {}
+        for row in cursor.fetchall():
+            groups_by_source.setdefault(row[2], []).append(row)
+        
+        updates = []
+        to_delete = []
+        
+        for rows in groups_by_source.values():
+            kept = []
+            
+            for fact_id, content, _, salience, _, success in rows:
+                words = _normalize_words(content)
+                
+                match = None
+                for survivor in kept:
+                    if _jaccard(survivor["words"], words) >= self.similarity_threshold:
+                        match = survivor
+                        break
+                
+                if match is None:
+                    kept.append({
+                        "id": fact_id,
+                        "words": words,
+                        "salience": salience,
+                        "success": success,
+                        "merged": 0
+                    })
+                else:
+                    # Repetition reinforces the newest copy of the fact
+                    match["salience"] = min(1.0, max(match["salience"], salience) + 0.05)
+                    match["success"] = max(match["success"], success)
+                    match["merged"] += 1
+                    to_delete.append((fact_id,))
+            
+            for survivor in kept:
+                if survivor["merged"]:
+                    updates.append((survivor["salience"], survivor["success"], survivor["id"]))
+        
+        cursor.executemany("UPDATE facts SET salience = ?, success_outcome = ? WHERE id = ?", updates)
+        cursor.executemany("DELETE FROM facts WHERE id = ?", to_delete)
+        return len(to_delete)
+    
+    def _merge_relations(self, cursor):
+        cursor.execute("""
+            DELETE FROM entity_relations
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM entity_relations
+                GROUP BY entity1_id, entity2_id, relation_type
+            )
+        """)
+        return cursor.rowcount
+    
+    def _evict_facts(self, cursor):
+        cursor.execute("""
+            DELETE FROM facts
+            WHERE id IN (
+                SELECT id FROM facts
+                ORDER BY salience ASC, timestamp ASC
+                LIMIT MAX((SELECT COUNT(*) FROM facts) - ?, 0)
+            )
+        """, (self.max_facts,))
+        return cursor.rowcount
+    
+    def _evict_entities(self, cursor):
+        # Entities that take part in no relation are evicted first, oldest first
+        cursor.execute("""
+            DELETE FROM entities
+            WHERE id IN (
+                SELECT e.id FROM entities e
+                ORDER BY (
+                    SELECT COUNT(*) FROM entity_relations er
+                    WHERE er.entity1_id = e.id OR er.entity2_id = e.id
+                ) ASC, e.timestamp ASC
+                LIMIT MAX((SELECT COUNT(*) FROM entities) - ?, 0)
+            )
+        """, (self.max_entities,))
+        return cursor.rowcount
+    
+    def _evict_relations(self, cursor):
+        cursor.execute("""
+            DELETE FROM entity_relations
+            WHERE entity1_id NOT IN (SELECT id FROM entities)
+               OR entity2_id NOT IN (SELECT id FROM entities)
+        """)
+        dangling = cursor.rowcount
+        
+        cursor.execute("""
+            DELETE FROM entity_relations
+            WHERE id IN (
+                SELECT id FROM entity_relations
+                ORDER BY timestamp ASC
+                LIMIT MAX((SELECT COUNT(*) FROM entity_relations) - ?, 0)
+            )
+        """, (self.max_relations,))
+        return dangling + cursor.rowcount
+
+def _normalize_words(text):
+    return frozenset(re.findall(r'[a-z0-9]+', text.lower()))
+
+def _jaccard(a, b):
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
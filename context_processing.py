@@ -0,0 +1,148 @@
+import re
+from config import CONTEXT_DEDUP_SIMILARITY, CONTEXT_SHINGLE_SIZE
+
+MIN_OVERLAP_CHARS = 20
+
+def process_context(retrieved_chunks, dedup_similarity=CONTEXT_DEDUP_SIMILARITY):
+    """
+    Merge overlapping or adjacent chunks of the same article and drop near-duplicates.
+    
+    Fixed chunks are ordered by their start_token/end_token span, other chunks by
+    consecutive chunk_id. The text shared by two overlapping neighbours is found
+    with a suffix/prefix match and kept once. Passages keep the rank of their best
+    chunk, so the result is still ordered by relevance.
+    """
+    passages = _merge_neighbours(retrieved_chunks)
+    return _drop_near_duplicates(passages, dedup_similarity)
+
+def _merge_neighbours(retrieved_chunks):
+    by_article = {}
+    for rank, chunk in enumerate(retrieved_chunks):
+        title = chunk["metadata"].get("title", "Unknown")
+        by_article.setdefault(title, []).append((rank, chunk))
+    
+    passages = []
+    for ranked_chunks in by_article.values():
+        ranked_chunks.sort(key=lambda item: _position(item[1]))
+        
+        current = None
+        for rank, chunk in ranked_chunks:
+            if current is not None:
+                relation = _adjacency(current["metadata"], chunk["metadata"])
+                merged_text = _join(current["text"], chunk["text"], relation) if relation else None
+                if merged_text is not None:
+                    _extend_passage(current, rank, chunk, merged_text)
+                    continue
+                passages.append(current)
+            
+            current = _new_passage(rank, chunk)
+        
+        passages.append(current)
+    
+    passages.sort(key=lambda passage: passage["rank"])
+    return passages
+
+def _position(chunk):
+    metadata = chunk["metadata"]
+    return (metadata.get("start_token", -1), metadata.get("chunk_id", -1))
+
+def _adjacency(left, right):
+    """How two chunks of one article relate: "overlapping", "touching", "consecutive" or None."""
+    if "end_token" in left and "start_token" in right:
+        if right["start_token"] < left["end_token"]:
+            return "overlapping"
+        if right["start_token"] == left["end_token"]:
+            return "touching"
+        return None
+    if "chunk_id" in left and "chunk_id" in right and right["chunk_id"] == left["chunk_id"] + 1:
+        return "consecutive"
+    return None
+
+def _join(left, right, relation):
+    if relation != "touching":
+        if right in left:
+            return left
+        
+        overlap = _suffix_prefix_overlap(left, right)
+        if overlap >= MIN_OVERLAP_CHARS:
+            return left + right[overlap:]
+        
+        # Token spans that overlap but whose decoded text does not line up stay separate
+        if relation == "overlapping":
+            return None
+    
+    return left.rstrip() + " " + right.lstrip()
+
+def _suffix_prefix_overlap(left, right):
+    """Length of the longest suffix of `left` that is also a prefix of `right` (KMP failure function)."""
+    if not left or not right:
+        return 0
+    
+    pattern = right[:len(left)]
+    failure = [0] * len(pattern)
+    
+    k = 0
+    for i in range(1, len(pattern)):
+        while k and pattern[i] != pattern[k]:
+            k = failure[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        failure[i] = k
+    
+    # Only the tail of `left` can overlap with the prefix
+    k = 0
+    for char in left[len(left) - len(pattern):]:
+        while k and char != pattern[k]:
+            k = failure[k - 1]
+        if char == pattern[k]:
+            k += 1
+            if k == len(pattern):
+                return k
+    return k
+
+def _new_passage(rank, chunk):
+    return {
+        "id": chunk["id"],
+        "text": chunk["text"],
+        "metadata": dict(chunk["metadata"]),
+        "distance": chunk["distance"],
+        "rank": rank,
+        "chunk_ids": [chunk["id"]]
+    }
+
+def _extend_passage(passage, rank, chunk, merged_text):
+    passage["text"] = merged_text
+    passage["chunk_ids"].append(chunk["id"])
+    passage["id"] = "+".join(passage["chunk_ids"])
+    passage["rank"] = min(passage["rank"], rank)
+    passage["distance"] = min(passage["distance"], chunk["distance"])
+    
+    for key in ("end_token", "chunk_id"):
+        if key in chunk["metadata"]:
+            passage["metadata"][key] = max(passage["metadata"].get(key, 0), chunk["metadata"][key])
+
+def _drop_near_duplicates(passages, dedup_similarity):
+    kept = []
+    kept_shingles = []
+    
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        if any(_jaccard(shingles, other) >= dedup_similarity for other in kept_shingles):
+            continue
+        kept.append(passage)
+        kept_shingles.append(shingles)
+    
+    return kept
+
+def _shingles(text, size=CONTEXT_SHINGLE_SIZE):
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    if len(words) <= size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+def _jaccard(a, b):
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
\ No newline at end of file
@@ -1,51 +1,255 @@
-import wikipedia
+import httpx
 import os
 import json
 import re
-from config import WIKIPEDIA_TOPICS, SECTIONS_TO_REMOVE, CORPUS_DIR
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import (
+    WIKIPEDIA_TOPICS, SECTIONS_TO_REMOVE, CORPUS_DIR, CORPUS_MANIFEST_PATH, CORPUS_CHANGES_PATH,
+    WIKI_BACKEND, WIKI_API_URL, WIKI_USER_AGENT, WIKI_REQUEST_TIMEOUT, WIKI_REVISION_BATCH, FETCH_WORKERS
+)
+
+class WikipediaSource:
+    """MediaWiki query API, called over one pooled HTTP client shared by the fetch threads."""
+    
+    def __init__(self, api_url=WIKI_API_URL, timeout=WIKI_REQUEST_TIMEOUT):
+        self.api_url = api_url
+        self.client = httpx.Client(timeout=timeout, headers={"User-Agent": WIKI_USER_AGENT})
+    
+    def request(self, params):
+        response = self.client.get(self.api_url, params={**params, "action": "query", "format": "json"})
+        response.raise_for_status()
+        return response.json()
+
+def create_wiki_source(backend=WIKI_BACKEND):
+    if backend == "standin":
+        from wiki_standin import WikiStandIn
+        return WikiStandIn()
+    return WikipediaSource()
 
 def clean_article_content(content):
     for section in SECTIONS_TO_REMOVE:
         if f"== {section} ==" in content:
             content = content.split(f"== {section} ==")[0]
-        
+    
     return content
 
-def fetch_wikipedia_articles():
+def article_filename(topic):
+    return f"{topic.replace(' ', '_').replace('(', '').replace(')', '')}.json"
+
+def article_hash(article_data):
+    # The summary is left out: it is derived from the content, and older files differ from it in whitespace
+    key = {field: article_data[field] for field in ("title", "url", "content")}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def fetch_revision_ids(source, topics, batch_size=WIKI_REVISION_BATCH):
+    """Latest revision ID of each topic's page, looked up `batch_size` titles per request."""
+    revisions = {}
+    
+    for start in range(0, len(topics), batch_size):
+        batch = topics[start:start + batch_size]
+        query = source.request({
+            "prop": "revisions",
+            "rvprop": "ids",
+            "titles": "|".join(batch),
+            "redirects": ""
+        }).get("query", {})
+        
+        # Requested titles may come back normalized and then redirected
+        renamed = {item["from"]: item["to"] for key in ("normalized", "redirects") for item in query.get(key, [])}
+        latest = {
+            page["title"]: page["revisions"][0]["revid"]
+            for page in query.get("pages", {}).values() if page.get("revisions")
+        }
+        
+        for topic in batch:
+            title = renamed.get(topic, topic)
+            title = renamed.get(title, title)
+            if title in latest:
+                revisions[topic] = latest[title]
+    
+    return revisions
+
+def fetch_article(source, topic):
+    """Download one page's plain-text content, URL and revision ID in a single request."""
+    pages = source.request({
+        "prop": "extracts|revisions|info",
+        "explaintext": "",
+        "rvprop": "ids",
+        "inprop": "url",
+        "titles": topic,
+        "redirects": ""
+    }).get("query", {}).get("pages", {})
+    
+    page = next(iter(pages.values()), None)
+    if page is None or "missing" in page or "extract" not in page:
+        raise LookupError(f"No page found for {topic}")
+    
+    content = page["extract"]
+    article_data = {
+        "title": page["title"],
+        "url": page["fullurl"],
+        "content": clean_article_content(content),
+        # The lead section, as the wikipedia package's page().summary returned it
+        "summary": re.split(r"\n\n\n== ", content, maxsplit=1)[0].strip()
+    }
+    return article_data, page["revisions"][0]["revid"]
+
+def fetch_wikipedia_articles(topics=WIKIPEDIA_TOPICS, source=None, workers=FETCH_WORKERS, force=False):
+    """
+    Fetch the corpus, or refresh it by downloading only articles that changed.
+    
+    Revision IDs for every topic are looked up in batches first, and topics whose
+    revision and file match the manifest are skipped. The rest are downloaded by
+    `workers` threads; a file is rewritten only when the article's content hash
+    changed, so a refresh that finds no changes leaves the corpus, and with it
+    every chunk ID, as it was. Chunk IDs are positions across the whole sorted
+    corpus, so any changed article shifts the IDs after it and the collections
+    built from it are rebuilt on their next ingestion. The manifest records each
+    topic's revision and hash; the changes manifest accumulates the added and
+    updated files over fetches as a record of what changed, until a sweep has
+    brought every collection up to date and marks them ingested. `force`
+    downloads every topic again.
+    """
     os.makedirs(CORPUS_DIR, exist_ok=True)
+    source = source or create_wiki_source()
+    manifest = _read_json(CORPUS_MANIFEST_PATH, {})
     
-    articles = []
+    try:
+        revisions = fetch_revision_ids(source, list(topics))
+    except Exception as e:
+        print(f"Error looking up revisions, fetching every article: {e}")
+        revisions = {}
     
-    for topic in WIKIPEDIA_TOPICS:
-        try:
-            print(f"Fetching: {topic}")
-            page = wikipedia.page(topic, auto_suggest=False)
-            
-            content = clean_article_content(page.content)
-            
-            article_data = {
-                "title": page.title,
-                "url": page.url,
-                "content": content,
-                "summary": page.summary
-            }
-            
-            articles.append(article_data)
-            
-            filename = f"{topic.replace(' ', '_').replace('(', '').replace(')', '')}.json"
-            filepath = os.path.join(CORPUS_DIR, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(article_data, f, indent=2, ensure_ascii=False)
-            
-            print(f"Saved: {filename}")
+    changes = {"added": [], "updated": [], "unchanged": [], "failed": []}
+    to_fetch = []
+    
+    for topic in topics:
+        entry = manifest.get(topic)
+        current = (
+            entry is not None and topic in revisions and entry["revision_id"] == revisions[topic]
+            and os.path.exists(os.path.join(CORPUS_DIR, entry["filename"]))
+        )
+        if current and not force:
+            changes["unchanged"].append(entry["filename"])
+        else:
+            to_fetch.append(topic)
+    
+    print(f"{len(topics) - len(to_fetch)} of {len(topics)} articles are at their latest revision; fetching {len(to_fetch)}")
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_article, source, topic): topic for topic in to_fetch}
+        
+        for future in as_completed(futures):
+            topic = futures[future]
+            try:
+                article_data, revision_id = future.result()
+            except Exception as e:
+                print(f"Error fetching {topic}: {e}")
+                changes["failed"].append(topic)
+                continue
             
-        except Exception as e:
-            print(f"Error fetching {topic}: {e}")
+            filename, status = _save_article(topic, article_data, revision_id, manifest)
+            changes[status].append(filename)
+            print(f"{status.capitalize()}: {filename}")
+    
+    _write_json(CORPUS_MANIFEST_PATH, manifest)
+    pending = _record_changes(changes)
     
-    print(f"\nSuccessfully fetched {len(articles)} articles")
+    print(f"\n{len(changes['added'])} added, {len(changes['updated'])} updated, "
+          f"{len(changes['unchanged'])} unchanged, {len(changes['failed'])} failed")
+    print(f"{len(pending['added']) + len(pending['updated'])} changed articles awaiting ingestion, "
+          f"listed in {CORPUS_CHANGES_PATH}")
+    
+    articles = []
+    for topic in topics:
+        filepath = os.path.join(CORPUS_DIR, article_filename(topic))
+        if os.path.exists(filepath):
+            articles.append(_read_json(filepath))
+    return articles
+
+def load_changed_articles(changes_path=CORPUS_CHANGES_PATH):
+    """Articles added or updated by fetches since the last ingestion."""
+    changes = _read_json(changes_path, {})
+    if changes.get("ingested_at"):
+        return []
+    
+    articles = []
+    for filename in changes.get("added", []) + changes.get("updated", []):
+        filepath = os.path.join(CORPUS_DIR, filename)
+        if os.path.exists(filepath):
+            articles.append(_read_json(filepath))
     return articles
 
+def mark_changes_ingested(changes_path=CORPUS_CHANGES_PATH):
+    """Record that every collection now reflects the pending changes, so the next fetch starts a new list."""
+    changes = _read_json(changes_path, {})
+    if changes and not changes.get("ingested_at"):
+        changes["ingested_at"] = time.time()
+        _write_json(changes_path, changes)
+
+def _record_changes(changes, changes_path=CORPUS_CHANGES_PATH):
+    # Changes not yet ingested are kept, so a second fetch before ingestion does not hide the first one's
+    pending = _read_json(changes_path, {})
+    if pending.get("ingested_at"):
+        pending = {}
+    
+    now = time.time()
+    added = set(pending.get("added", [])) | set(changes["added"])
+    updated = (set(pending.get("updated", [])) | set(changes["updated"])) - added
+    
+    pending = {
+        "first_fetched_at": pending.get("first_fetched_at", now),
+        "fetched_at": now,
+        "fetches": pending.get("fetches", 0) + 1,
+        "added": sorted(added),
+        "updated": sorted(updated),
+        "unchanged": sorted(set(changes["unchanged"]) - added - updated),
+        "failed": sorted(changes["failed"])
+    }
+    _write_json(changes_path, pending)
+    return pending
+
+def _save_article(topic, article_data, revision_id, manifest):
+    filename = article_filename(topic)
+    filepath = os.path.join(CORPUS_DIR, filename)
+    content_hash = article_hash(article_data)
+    
+    previous_hash = manifest.get(topic, {}).get("content_hash")
+    if previous_hash is None and os.path.exists(filepath):
+        # Files fetched before the manifest existed are compared by content
+        previous_hash = article_hash(_read_json(filepath))
+    
+    if previous_hash == content_hash and os.path.exists(filepath):
+        status = "unchanged"
+    else:
+        status = "updated" if os.path.exists(filepath) else "added"
+        _write_json(filepath, article_data)
+    
+    manifest[topic] = {
+        "title": article_data["title"],
+        "filename": filename,
+        "revision_id": revision_id,
+        "content_hash": content_hash,
+        "fetched_at": time.time()
+    }
+    return filename, status
+
+def _read_json(path, default=None):
+    if default is not None and not os.path.exists(path):
+        return default
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_json(path, data):
+    # Written beside the target and renamed, so a crash never leaves a half-written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
 def load_corpus():
     articles = []
     
@@ -1,13 +1,25 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY
+from llm_client import create_openai_client, create_async_openai_client
+from tracing import traced
+from resilience import get_resilient_caller
+from config import OPENAI_BACKEND, EMBEDDING_CALL_TIMEOUT, EMBEDDING_CALL_DEADLINE
+import asyncio
 import time
 
 class EmbeddingGenerator:
-    def __init__(self, model="text-embedding-3-small", dimensions=None):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, model="text-embedding-3-small", dimensions=None, backend=OPENAI_BACKEND):
+        self.client = create_openai_client(backend)
+        self.async_client = create_async_openai_client(backend)
         self.model = model
         self.dimensions = dimensions
+        # Single-query and multi-text calls keep separate latency stats, so ingestion batches do not inflate the query hedge delay
+        self.query_caller = get_resilient_caller(
+            "embeddings.query", timeout=EMBEDDING_CALL_TIMEOUT, deadline=EMBEDDING_CALL_DEADLINE, upstream="embeddings"
+        )
+        self.batch_caller = get_resilient_caller(
+            "embeddings.batch", timeout=EMBEDDING_CALL_TIMEOUT, deadline=EMBEDDING_CALL_DEADLINE, upstream="embeddings"
+        )
     
+    @traced("embedding.generate")
     def generate(self, texts, batch_size=100):
         if isinstance(texts, str):
             texts = [texts]
@@ -22,19 +34,54 @@ class EmbeddingGenerator:
                 if self.dimensions:
                     kwargs["dimensions"] = self.dimensions
                 
-                response = self.client.embeddings.create(**kwargs)
+                response = self._caller(batch).call(self.client.embeddings.create, **kwargs)
                 
                 batch_embeddings = [item.embedding for item in response.data]
                 embeddings.extend(batch_embeddings)
                 
-                time.sleep(0.1)
+                # Only pause between batches so single queries are not delayed
+                if i + batch_size < len(texts):
+                    time.sleep(0.1)
+            
+            except Exception as e:
+                print(f"Error generating embeddings for batch {i}: {e}")
+                raise
+        
+        return embeddings if len(embeddings) > 1 else embeddings[0]
+    
+    @traced("embedding.generate")
+    async def agenerate(self, texts, batch_size=100):
+        if isinstance(texts, str):
+            texts = [texts]
+        
+        embeddings = []
+        
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            
+            try:
+                kwargs = {"input": batch, "model": self.model}
+                if self.dimensions:
+                    kwargs["dimensions"] = self.dimensions
                 
+                response = await self._caller(batch).acall(self.async_client.embeddings.create, **kwargs)
+                
+                batch_embeddings = [item.embedding for item in response.data]
+                embeddings.extend(batch_embeddings)
+                
+                # Only pause between batches so single queries are not delayed
+                if i + batch_size < len(texts):
+                    await asyncio.sleep(0.1)
+            
             except Exception as e:
                 print(f"Error generating embeddings for batch {i}: {e}")
                 raise
         
         return embeddings if len(embeddings) > 1 else embeddings[0]
     
+    def _caller(self, batch):
+        return self.query_caller if len(batch) == 1 else self.batch_caller
+    
     def get_dimensions(self):
         return self.dimensions if self.dimensions else self._get_default_dimensions()
     
@@ -1,13 +1,29 @@
 import json
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
-from config import INPUT_COST_PER_1K, OUTPUT_COST_PER_1K
+from config import INPUT_COST_PER_1K, OUTPUT_COST_PER_1K, SIMILARITY_MODEL, SIMILARITY_BATCH_SIZE
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+def get_evaluator():
+    """Process-wide Evaluator, so the similarity model is loaded once and reference embeddings are reused."""
+    global _evaluator
+    
+    with _evaluator_lock:
+        if _evaluator is None:
+            _evaluator = Evaluator()
+        return _evaluator
 
 class Evaluator:
-    def __init__(self):
-        self.similarity_model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, model_name=SIMILARITY_MODEL, batch_size=SIMILARITY_BATCH_SIZE):
+        # Imported here so aggregating logged results and plotting do not load torch
+        from sentence_transformers import SentenceTransformer
+        
+        self.similarity_model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self._reference_embeddings = {}
     
     def evaluate_retrieval_quality(self, retrieved_chunks, gold_chunk_ids, k=5):
         """
@@ -50,55 +66,99 @@ class Evaluator:
         }
     
     def evaluate_answer_quality(self, generated_answer, reference_answer):
-        if not reference_answer or not generated_answer:
-            return {"semantic_similarity": 0.0}
+        return self.evaluate_answer_quality_batch([generated_answer], [reference_answer])[0]
+    
+    def evaluate_answer_quality_batch(self, generated_answers, reference_answers):
+        """
+        Score many (generated, reference) pairs at once.
         
-        gen_embedding = self.similarity_model.encode([generated_answer])
-        ref_embedding = self.similarity_model.encode([reference_answer])
+        Generated answers are encoded in batches of `batch_size`, reference answers
+        are encoded once per process and cached, and cosine similarity is a row-wise
+        dot product of the normalized embeddings. Pairs with an empty side score 0.0.
+        """
+        scored = [i for i, (gen, ref) in enumerate(zip(generated_answers, reference_answers)) if gen and ref]
+        similarities = np.zeros(len(generated_answers))
         
-        similarity = cosine_similarity(gen_embedding, ref_embedding)[0][0]
+        if scored:
+            gen_embeddings = self._encode([generated_answers[i] for i in scored])
+            ref_embeddings = self._reference_embeddings_for([reference_answers[i] for i in scored])
+            similarities[scored] = np.einsum('ij,ij->i', gen_embeddings, ref_embeddings)
         
-        return {
-            "semantic_similarity": float(similarity)
-        }
+        return [{"semantic_similarity": float(similarity)} for similarity in similarities]
     
-    def aggregate_metrics(self, results):
-        if not results:
-            return {}
+    def _reference_embeddings_for(self, references):
+        missing = list(dict.fromkeys(ref for ref in references if ref not in self._reference_embeddings))
+        if missing:
+            self._reference_embeddings.update(zip(missing, self._encode(missing)))
         
-        hit_rates = [r["retrieval_metrics"]["hit_rate"] for r in results]
-        mrrs = [r["retrieval_metrics"]["mrr"] for r in results]
-        similarities = [r["answer_metrics"]["semantic_similarity"] for r in results]
-        latencies = [r["latency"] for r in results]
-        tokens_in = [int(r["tokens_in"]) for r in results]
-        tokens_out = [int(r["tokens_out"]) for r in results]
-        
-        aggregated = {
-            "retrieval": {
-                "hit_rate_mean": np.mean(hit_rates),
-                "mrr_mean": np.mean(mrrs)
-            },
-            "answer_quality": {
-                "semantic_similarity_mean": np.mean(similarities)
-            },
-            "latency": {
-                "p50": np.percentile(latencies, 50),
-                "p95": np.percentile(latencies, 95)
-            },
-            "cost": {
-                "tokens_in_total": sum(tokens_in),
-                "tokens_out_total": sum(tokens_out)
+        return np.stack([self._reference_embeddings[ref] for ref in references])
+    
+    def _encode(self, texts):
+        return self.similarity_model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+    
+    def aggregate_metrics(self, results):
+        return aggregate_metrics(results)
+
+def aggregate_metrics(results):
+    if not results:
+        return {}
+    
+    hit_rates = [r["retrieval_metrics"]["hit_rate"] for r in results]
+    mrrs = [r["retrieval_metrics"]["mrr"] for r in results]
+    similarities = [r["answer_metrics"]["semantic_similarity"] for r in results]
+    latencies = [r["latency"] for r in results]
+    tokens_in = [int(r["tokens_in"]) for r in results]
+    tokens_out = [int(r["tokens_out"]) for r in results]
+    
+    aggregated = {
+        "retrieval": {
+            "hit_rate_mean": np.mean(hit_rates),
+            "mrr_mean": np.mean(mrrs)
+        },
+        "answer_quality": {
+            "semantic_similarity_mean": np.mean(similarities)
+        },
+        "latency": {
+            "p50": np.percentile(latencies, 50),
+            "p95": np.percentile(latencies, 95)
+        },
+        "cost": {
+            "tokens_in_total": sum(tokens_in),
+            "tokens_out_total": sum(tokens_out)
+        }
+    }
+    
+    total_cost = (
+        (aggregated["cost"]["tokens_in_total"] / 1000) * INPUT_COST_PER_1K +
+        (aggregated["cost"]["tokens_out_total"] / 1000) * OUTPUT_COST_PER_1K
+    )
+    
+    aggregated["cost"]["estimated_total_usd"] = total_cost
+    
+    aggregated["cost"]["cached_answers"] = sum(1 for r in results if r.get("cached"))
+    
+    stage_samples = {}
+    for r in results:
+        for stage, seconds in r.get("stage_latencies", {}).items():
+            stage_samples.setdefault(stage, []).append(seconds)
+    
+    if stage_samples:
+        aggregated["stages"] = {
+            stage: {
+                "p50": np.percentile(samples, 50),
+                "p95": np.percentile(samples, 95),
+                "p99": np.percentile(samples, 99),
+                "count": len(samples)
             }
+            for stage, samples in sorted(stage_samples.items())
         }
-        
-        total_cost = (
-            (aggregated["cost"]["tokens_in_total"] / 1000) * INPUT_COST_PER_1K +
-            (aggregated["cost"]["tokens_out_total"] / 1000) * OUTPUT_COST_PER_1K
-        )
-        
-        aggregated["cost"]["estimated_total_usd"] = total_cost
-        
-        return aggregated
+    
+    return aggregated
 
 def load_evaluation_dataset(filepath="evaluation_dataset.json"):
     if not os.path.exists(filepath):
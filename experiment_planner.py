@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from data_ingestion import load_corpus, mark_changes_ingested
+from vector_store import VectorStore
+from memory import LongTermMemory
+from rate_limit import TokenBucketLimiter
+from graph_prebuild import prebuild_entity_graph
+from run_experiments import chunk_corpus, build_vector_store, collection_name_for, run_single_experiment
+from config import (
+    CHUNK_CONFIGS, EMBEDDING_CONFIGS, MEMORY_CONFIGS, PREBUILD_ENTITY_GRAPH,
+    OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, EXPERIMENT_WORKERS, EXPERIMENT_LTM_DIR
+)
+
+class Stage:
+    def __init__(self, key, func, args=(), deps=()):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.deps = list(deps)
+
+class ExperimentPlanner:
+    """
+    Runs a sweep of experiments as a graph of corpus, chunk, index, graph and evaluate stages.
+    
+    Stages are keyed by the configuration they depend on, so experiments with the
+    same chunking share one chunk stage, the same chunking and embedding share one
+    index, and identical configurations share one evaluation whose results are
+    reported under every experiment name. Stages run in a process pool as soon as
+    their dependencies finish; each evaluation gets a fresh LTM database, seeded
+    from the prebuilt entity graph when PREBUILD_ENTITY_GRAPH is on, and an equal
+    share of the API rate limits. With a `results_log`, evaluations append their
+    queries to it and every experiment is recorded there once its evaluation ends;
+    with `resume` an evaluation keeps the LTM database its earlier run left behind.
+    Pending corpus changes are marked ingested once the last index stage finishes.
+    """
+    
+    def __init__(self, experiments, evaluation_dataset, workers=EXPERIMENT_WORKERS, ltm_dir=EXPERIMENT_LTM_DIR,
+                 prebuild_graph=PREBUILD_ENTITY_GRAPH, results_log=None, resume=False):
+        self.evaluation_dataset = evaluation_dataset
+        self.results_log = results_log
+        self.resume = resume
+        self.workers = workers
+        self.ltm_dir = ltm_dir
+        self.prebuild_graph = prebuild_graph
+        
+        self.stages = {}
+        self.experiment_stages = {}
+        self.timings = {}
+        
+        for experiment in experiments:
+            self._plan(experiment)
+        
+        evaluations = [stage for stage in self.stages.values() if stage.func is _evaluate_stage]
+        share = max(1, min(workers, len(evaluations)))
+        for stage in evaluations:
+            stage.args = stage.args + ((OPENAI_RPM_LIMIT / share, OPENAI_TPM_LIMIT / share), results_log, resume)
+    
+    def describe(self):
+        counts = {}
+        for key in self.stages:
+            kind = key.split(":", 1)[0]
+            counts[kind] = counts.get(kind, 0) + 1
+        return {"experiments": len(self.experiment_stages), "stages": counts}
+    
+    def run(self):
+        """Run every stage once and return one result per experiment, in plan order."""
+        start_time = time.time()
+        plan = self.describe()
+        print(f"Planned {plan['experiments']} experiments as {plan['stages']} with {self.workers} workers")
+        
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+        
+        # Chroma and the tokenizers start threads, so workers are spawned rather than forked
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        
+        try:
+            while pending or running:
+                ready = [key for key, stage in pending.items() if all(dep in results for dep in stage.deps)]
+                
+                for key in ready:
+                    stage = pending.pop(key)
+                    args = (*stage.args, *(results[dep] for dep in stage.deps))
+                    
+                    if executor is None:
+                        results[key], self.timings[key] = _timed(stage.func, *args)
+                        self._finished(key, results[key])
+                    else:
+                        running[executor.submit(_timed, stage.func, *args)] = key
+                
+                if not running:
+                    continue
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    results[key], self.timings[key] = future.result()
+                    self._finished(key, results[key])
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        
+        experiment_results = []
+        for config_name, key in self.experiment_stages.items():
+            # Experiments that share an evaluation report its results under their own name
+            experiment_results.append({**results[key], "config_name": config_name})
+        
+        print(f"Ran {len(self.stages)} stages for {len(experiment_results)} experiments in {time.time() - start_time:.2f}s")
+        return experiment_results
+    
+    def _finished(self, key, result):
+        print(f"Stage {key} finished in {self.timings[key]:.2f}s")
+        
+        # Other collections may still be built from the old corpus until the sweep's last index is done
+        if key.startswith("index:") and all(stage in self.timings for stage in self.stages if stage.startswith("index:")):
+            mark_changes_ingested()
+        
+        if self.results_log is None or self.stages[key].func is not _evaluate_stage:
+            return
+        
+        for config_name, stage_key in self.experiment_stages.items():
+            if stage_key == key:
+                self.results_log.append_experiment(
+                    config_name,
+                    source=result["config_name"],
+                    chunk_config=result["chunk_config"],
+                    embedding_config=result["embedding_config"],
+                    memory_config=result["memory_config"],
+                    metrics={name: result["aggregated_metrics"][name]
+                             for name in ("answer_cache", "resilience") if name in result["aggregated_metrics"]}
+                )
+    
+    def _plan(self, experiment):
+        config_name = experiment["config_name"]
+        chunk_config = CHUNK_CONFIGS[experiment["chunk"]]
+        embedding_config = EMBEDDING_CONFIGS[experiment["embedding"]]
+        memory_config = MEMORY_CONFIGS[experiment["memory"]]
+        
+        chunk_id = f"{chunk_config['strategy']}_{chunk_config['size']}_{chunk_config['overlap']}"
+        embedding_id = f"{embedding_config['model']}_{embedding_config['dimensions']}"
+        memory_id = f"stm{int(memory_config['use_stm'])}_ltm{int(memory_config['use_ltm'])}"
+        
+        corpus = self._add("corpus", _corpus_stage)
+        chunks = self._add(f"chunk:{chunk_id}", _chunk_stage, (chunk_config,), [corpus])
+        
+        # The first experiment to use an index names its collection, matching collections built before the planner
+        collection_name = collection_name_for(config_name, chunk_config)
+        index = self._add(f"index:{embedding_id}:{chunk_id}", _index_stage, (embedding_config, collection_name), [chunks])
+        
+        deps = [index]
+        if memory_config["use_ltm"] and self.prebuild_graph:
+            seed_path = os.path.join(self.ltm_dir, f"graph_{chunk_id}.db")
+            deps.append(self._add(f"graph:{chunk_id}", _graph_stage, (seed_path, chunk_id), [chunks]))
+        
+        ltm_path = os.path.join(self.ltm_dir, f"{config_name}.db")
+        evaluate = self._add(
+            f"evaluate:{embedding_id}:{chunk_id}:{memory_id}",
+            _evaluate_stage,
+            (config_name, chunk_config, embedding_config, memory_config, self.evaluation_dataset, ltm_path),
+            deps
+        )
+        self.experiment_stages[config_name] = evaluate
+    
+    def _add(self, key, func, args=(), deps=()):
+        if key not in self.stages:
+            self.stages[key] = Stage(key, func, args, deps)
+        return key
+
+def _timed(func, *args):
+    start_time = time.time()
+    result = func(*args)
+    return result, time.time() - start_time
+
+def _corpus_stage():
+    return load_corpus()
+
+def _chunk_stage(chunk_config, corpus):
+    return chunk_corpus(corpus, chunk_config)
+
+def _index_stage(embedding_config, collection_name, chunks):
+    vector_store = build_vector_store(chunks, embedding_config, collection_name)
+    return {"collection_name": collection_name, "persist_directory": vector_store.persist_directory}
+
+def _graph_stage(seed_path, marker, chunks):
+    prebuild_entity_graph(chunks, LongTermMemory(seed_path), marker=marker)
+    return seed_path
+
+def _evaluate_stage(config_name, chunk_config, embedding_config, memory_config, evaluation_dataset, ltm_path,
+                    rate_limits, results_log, resume, index, graph_seed=None):
+    vector_store = VectorStore(
+        collection_name=index["collection_name"],
+        persist_directory=index["persist_directory"],
+        embedding_config=embedding_config
+    )
+    
+    ltm = None
+    if memory_config["use_ltm"]:
+        os.makedirs(os.path.dirname(ltm_path), exist_ok=True)
+        # A resumed evaluation continues from the memory its logged queries built up
+        if not (resume and os.path.exists(ltm_path)):
+            if os.path.exists(ltm_path):
+                os.remove(ltm_path)
+            if graph_seed:
+                shutil.copyfile(graph_seed, ltm_path)
+        ltm = LongTermMemory(ltm_path)
+    
+    requests_per_minute, tokens_per_minute = rate_limits
+    return run_single_experiment(
+        config_name, chunk_config, embedding_config, memory_config, evaluation_dataset,
+        vector_store=vector_store,
+        ltm=ltm,
+        rate_limiter=TokenBucketLimiter(requests_per_minute, tokens_per_minute),
+        results_log=results_log
+    )
\ No newline at end of file
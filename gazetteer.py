@@ -0,0 +1,242 @@
+import os
+import json
+import re
+import threading
+from collections import deque
+from config import WIKIPEDIA_TOPICS, CORPUS_DIR, CORPUS_MANIFEST_PATH
+
+class _Automaton:
+    """Aho-Corasick automaton over lowercase keys."""
+    
+    def __init__(self, keys):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]
+        # Nearest node on the fail chain that ends a key, so matches are reported in O(1) each
+        self.dict_link = [0]
+        
+        for key in keys:
+            self._insert(key)
+        self._link()
+    
+    def _insert(self, key):
+        node = 0
+        for char in key:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.dict_link.append(0)
+            node = next_node
+        self.output[node] = key
+    
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                
+                target = self.fail[child]
+                self.dict_link[child] = target if self.output[target] is not None else self.dict_link[target]
+                queue.append(child)
+    
+    def iter_matches(self, text):
+        """Yield (end_index, key) for every key occurrence, including overlapping ones."""
+        goto = self.goto
+        fail = self.fail
+        node = 0
+        
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            
+            match_node = node if self.output[node] is not None else self.dict_link[node]
+            while match_node:
+                yield index, self.output[match_node]
+                match_node = self.dict_link[match_node]
+
+class Gazetteer:
+    """
+    Dictionary of known entity names matched in one linear pass over the text.
+    
+    Names are kept in a large base automaton plus a small delta automaton for
+    names added since the last full build, so adding a handful of new entities
+    does not rebuild the whole dictionary. Names of `case_insensitive_types`
+    (the topic and article-title phenomena) match in any case; other names, such
+    as persons and locations guessed from capitalization, only match as spelled,
+    so "The Green" does not turn up in "the green light".
+    """
+    
+    def __init__(self, entities=None, case_insensitive_types=("phenomenon",)):
+        self.case_insensitive_types = set(case_insensitive_types)
+        self._names = {}
+        self._base_keys = set()
+        self._delta_keys = set()
+        self._base = _Automaton([])
+        self._delta = _Automaton([])
+        self._dirty = False
+        self._lock = threading.Lock()
+        
+        for name, entity_type in entities or []:
+            self.add(name, entity_type)
+        self.rebuild()
+    
+    def __len__(self):
+        return len(self._names)
+    
+    def __contains__(self, name):
+        return name.lower() in self._names
+    
+    def add(self, name, entity_type):
+        key = name.lower().strip()
+        if not key:
+            return
+        
+        with self._lock:
+            types = self._names.setdefault(key, {})
+            # The first spelling registered for a type is kept as the canonical name
+            types.setdefault(entity_type, name)
+            
+            if key not in self._base_keys and key not in self._delta_keys:
+                self._delta_keys.add(key)
+                self._dirty = True
+    
+    def add_many(self, entities):
+        for name, entity_type in entities:
+            self.add(name, entity_type)
+    
+    def rebuild(self):
+        """Fold every name into the base automaton."""
+        with self._lock:
+            self._base_keys |= self._delta_keys
+            self._delta_keys = set()
+            self._base = _Automaton(self._base_keys)
+            self._delta = _Automaton([])
+            self._dirty = False
+    
+    def clear(self):
+        with self._lock:
+            self._names = {}
+            self._base_keys = set()
+            self._delta_keys = set()
+            self._base = _Automaton([])
+            self._delta = _Automaton([])
+            self._dirty = False
+    
+    def find(self, text):
+        """
+        Return mentions as (start, end, name, type) tuples ordered by position.
+        
+        Only whole-word matches count, and each start position reports its longest
+        name; overlapping mentions that start at different positions are all kept.
+        """
+        base, delta = self._automata()
+        lowered = _lower_preserving_length(text)
+        
+        longest = {}
+        for automaton in (base, delta):
+            for end_index, key in automaton.iter_matches(lowered):
+                start = end_index - len(key) + 1
+                end = end_index + 1
+                if not _is_word_boundary(text, start, end):
+                    continue
+                if start in longest and len(longest[start][0]) >= len(key):
+                    continue
+                
+                matched = [
+                    (name, entity_type) for entity_type, name in list(self._names[key].items())
+                    if entity_type in self.case_insensitive_types or text[start:end] == name
+                ]
+                if matched:
+                    longest[start] = (key, matched)
+        
+        mentions = []
+        for start in sorted(longest):
+            key, matched = longest[start]
+            for name, entity_type in matched:
+                mentions.append((start, start + len(key), name, entity_type))
+        return mentions
+    
+    def _automata(self):
+        with self._lock:
+            if self._dirty:
+                # Merge the delta into the base once it is no longer small
+                if len(self._delta_keys) > max(1000, len(self._base_keys) // 10):
+                    self._base_keys |= self._delta_keys
+                    self._delta_keys = set()
+                    self._base = _Automaton(self._base_keys)
+                self._delta = _Automaton(self._delta_keys)
+                self._dirty = False
+            return self._base, self._delta
+
+_corpus_titles = {}
+_corpus_titles_lock = threading.Lock()
+
+def load_topic_names():
+    """Phenomenon names from WIKIPEDIA_TOPICS and the titles of the articles in the corpus."""
+    titles = list(WIKIPEDIA_TOPICS) + _load_corpus_titles()
+    
+    names = []
+    for title in titles:
+        # "Fata Morgana (mirage)" is mentioned in text as "Fata Morgana"
+        name = re.sub(r'\s*\(.*?\)', '', title).strip().title()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+def _load_corpus_titles():
+    """Corpus article titles, cached per process until the corpus directory or manifest changes."""
+    if not os.path.exists(CORPUS_DIR):
+        return []
+    
+    version = (_mtime(CORPUS_DIR), _mtime(CORPUS_MANIFEST_PATH))
+    
+    with _corpus_titles_lock:
+        if _corpus_titles.get("version") == version:
+            return _corpus_titles["titles"]
+        
+        filenames = sorted(filename for filename in os.listdir(CORPUS_DIR) if filename.endswith('.json'))
+        manifest = {}
+        if os.path.exists(CORPUS_MANIFEST_PATH):
+            with open(CORPUS_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                manifest = {entry["filename"]: entry["title"] for entry in json.load(f).values()}
+        
+        titles = []
+        for filename in filenames:
+            if filename in manifest:
+                titles.append(manifest[filename])
+            else:
+                # Files fetched before the manifest existed are the only ones opened
+                with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+                    titles.append(json.load(f)["title"])
+        
+        _corpus_titles.update(version=version, titles=titles)
+        return titles
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def _lower_preserving_length(text):
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+def _is_word_boundary(text, start, end):
+    if start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from memory import EntityExtractor
+from chunking import chunks_hash
+from profiling import profiled
+from config import GRAPH_PREBUILD_WORKERS, GRAPH_PREBUILD_BATCH_SIZE
+
+_worker_extractor = None
+
+def _init_worker():
+    global _worker_extractor
+    _worker_extractor = EntityExtractor()
+
+def _extract_batch(texts):
+    entities = []
+    relations = []
+    
+    for text in texts:
+        chunk_entities = _worker_extractor.extract_from_text(text)
+        entities.extend(chunk_entities)
+        relations.extend(_worker_extractor.extract_relationships(text, chunk_entities))
+    
+    return entities, relations
+
+@profiled("ingest")
+def prebuild_entity_graph(chunks, ltm, marker=None, workers=GRAPH_PREBUILD_WORKERS,
+                          batch_size=GRAPH_PREBUILD_BATCH_SIZE):
+    """
+    Extract entities and relations from every chunk and bulk-load them into LTM.
+    
+    Extraction is spread across a process pool and everything is written in one
+    transaction. When `marker` is given the build is recorded in ltm_meta under
+    the marker and a hash of the chunk texts, and skipped on later calls with the
+    same marker over the same chunks; a changed corpus is built again.
+    """
+    texts = [chunk["text"] for chunk in chunks]
+    meta_key = f"graph_prebuild:{marker}:{chunks_hash(texts)}" if marker else None
+    
+    if meta_key and ltm.get_meta(meta_key):
+        print(f"Entity graph already prebuilt for {marker}")
+        return None
+    
+    start_time = time.time()
+    
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    
+    entities = {}
+    relations = set()
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for batch_entities, batch_relations in executor.map(_extract_batch, batches):
+            for entity in batch_entities:
+                # Names are unique in LTM; a phenomenon reading wins over location/person guesses
+                existing = entities.get(entity["name"])
+                if existing is None or (entity["type"] == "phenomenon" and existing["type"] != "phenomenon"):
+                    entities[entity["name"]] = entity
+            relations.update(batch_relations)
+    
+    ltm.save_batch(
+        entities=list(entities.values()),
+        relations=[
+            {"entity1": entity1, "entity2": entity2, "relation_type": relation_type}
+            for entity1, entity2, relation_type in sorted(relations)
+        ]
+    )
+    
+    if meta_key:
+        ltm.set_meta(meta_key, str(time.time()))
+    
+    stats = {
+        "chunks": len(texts),
+        "entities": len(entities),
+        "relations": len(relations),
+        "elapsed_seconds": time.time() - start_time
+    }
+    print(f"Prebuilt entity graph from {stats['chunks']} chunks: {stats['entities']} entities, "
+          f"{stats['relations']} relations in {stats['elapsed_seconds']:.2f}s")
+    return stats
@@ -0,0 +1,43 @@
+import threading
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
+from config import OPENAI_API_KEY, OPENAI_BACKEND, STANDIN_BASE_URL
+
+_standin_transport = None
+_standin_lock = threading.Lock()
+
+def get_standin_transport():
+    """Transport shared by every stand-in client so latency sampling and stats are process-wide."""
+    global _standin_transport
+    
+    with _standin_lock:
+        if _standin_transport is None:
+            from openai_standin import StandInTransport
+            _standin_transport = StandInTransport()
+        return _standin_transport
+
+def create_openai_client(backend=OPENAI_BACKEND):
+    # Retries are handled by resilience.ResilientCaller, so the SDK's own are turned off
+    if backend == "standin":
+        return OpenAI(
+            api_key=OPENAI_API_KEY or "standin",
+            base_url=STANDIN_BASE_URL,
+            http_client=httpx.Client(transport=get_standin_transport()),
+            max_retries=0
+        )
+    return OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+def create_async_openai_client(backend=OPENAI_BACKEND, max_connections=None):
+    """`max_connections` sizes the HTTP connection pool when one client is shared by many requests."""
+    if backend == "standin":
+        return AsyncOpenAI(
+            api_key=OPENAI_API_KEY or "standin",
+            base_url=STANDIN_BASE_URL,
+            http_client=httpx.AsyncClient(transport=get_standin_transport()),
+            max_retries=0
+        )
+    
+    if max_connections:
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        return AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=DefaultAsyncHttpxClient(limits=limits), max_retries=0)
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
\ No newline at end of file
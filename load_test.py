@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import uuid
+import numpy as np
+from memory import LongTermMemory
+from server import build_server, ingest_serving_corpus
+from evaluation import load_evaluation_dataset
+from config import (
+    LTM_DB_PATH, EXPERIMENT_LTM_DIR, RESULTS_DIR, EXPERIMENT_SEED, LOAD_TEST_RATE, LOAD_TEST_DURATION,
+    LOAD_TEST_CONCURRENCY_LEVELS, LOAD_TEST_SATURATION_TOLERANCE
+)
+
+LATENCY_PERCENTILES = (50, 95, 99, 99.9)
+
+def poisson_arrivals(rate, duration, seed=EXPERIMENT_SEED):
+    """Arrival offsets in seconds of a Poisson process with `rate` requests per second, up to `duration`."""
+    rng = random.Random(seed)
+    arrivals = []
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        arrivals.append(offset)
+        offset += rng.expovariate(rate)
+    return arrivals
+
+def latency_percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    
+    values = np.array(samples)
+    summary = {"count": len(values), "mean": float(values.mean()), "max": float(values.max())}
+    for percentile in LATENCY_PERCENTILES:
+        summary[f"p{percentile:g}"] = float(np.percentile(values, percentile))
+    return summary
+
+def find_saturation(levels, tolerance=LOAD_TEST_SATURATION_TOLERANCE):
+    """Smallest concurrency whose throughput is within `tolerance` of the best level; beyond it only latency grows."""
+    best = max(level["throughput"] for level in levels)
+    for level in sorted(levels, key=lambda level: level["max_concurrency"]):
+        if level["throughput"] >= best * (1 - tolerance):
+            return level["max_concurrency"]
+
+class LoadTest:
+    """
+    Open-loop load against an AgentServer, called in-process.
+    
+    Evaluation questions are sent at Poisson arrival times whether or not earlier
+    requests have finished, so a server that cannot keep up builds a queue
+    instead of slowing the load down. Latency runs from each request's scheduled
+    arrival, so time spent behind the concurrency limit (or a late dispatch) is
+    counted as queue time rather than hidden. The corpus is ingested and the
+    entity graph prebuilt once, into a seed copy of the serving LTM database;
+    every level then starts from its own copy of that seed, so levels see the
+    same memory and the original is left untouched.
+    """
+    
+    def __init__(self, questions, rate=LOAD_TEST_RATE, duration=LOAD_TEST_DURATION,
+                 ltm_path=os.path.join(EXPERIMENT_LTM_DIR, "load_test.db"), seed=EXPERIMENT_SEED):
+        self.questions = questions
+        self.rate = rate
+        self.duration = duration
+        self.ltm_path = ltm_path
+        self.seed_path = f"{os.path.splitext(ltm_path)[0]}_seed.db"
+        self.seed = seed
+        self.vector_store = None
+    
+    def prepare(self):
+        """Ingest the corpus and prebuild the graph into the seed database; done once per sweep."""
+        _copy_database(LTM_DB_PATH, self.seed_path)
+        seed_ltm = LongTermMemory(self.seed_path)
+        try:
+            self.vector_store = ingest_serving_corpus(seed_ltm)
+        finally:
+            seed_ltm.close()
+    
+    async def run_level(self, max_concurrency):
+        if self.vector_store is None:
+            self.prepare()
+        _copy_database(self.seed_path, self.ltm_path)
+        
+        server = build_server(max_concurrency=max_concurrency, ltm_path=self.ltm_path, vector_store=self.vector_store)
+        try:
+            samples, elapsed = await self._drive(server)
+            rate_limiter = server.agent.get_rate_limit_metrics()
+        finally:
+            server.agent.close()
+            server.agent.ltm.close()
+        
+        completed = [sample for sample in samples if sample["status"] == 200]
+        throughput = len(completed) / elapsed if elapsed else 0.0
+        
+        return {
+            "max_concurrency": max_concurrency,
+            "offered_rate": self.rate,
+            "requests": len(samples),
+            "completed": len(completed),
+            "errors": len(samples) - len(completed),
+            "error_rate": (len(samples) - len(completed)) / len(samples) if samples else 0.0,
+            "cached": sum(sample["cached"] for sample in completed),
+            "elapsed_seconds": elapsed,
+            "throughput": throughput,
+            "kept_up": throughput >= self.rate * (1 - LOAD_TEST_SATURATION_TOLERANCE),
+            "latency": latency_percentiles([sample["latency"] for sample in completed]),
+            "queue_time": latency_percentiles([sample["queue_time"] for sample in completed]),
+            "service_time": latency_percentiles([sample["service_time"] for sample in completed]),
+            "rate_limiter": rate_limiter
+        }
+    
+    async def _drive(self, server):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = []
+        
+        for i, offset in enumerate(poisson_arrivals(self.rate, self.duration, self.seed)):
+            delay = start + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            question = self.questions[i % len(self.questions)]
+            tasks.append(asyncio.create_task(self._request(server, question, start + offset)))
+        
+        samples = await asyncio.gather(*tasks)
+        return samples, loop.time() - start
+    
+    async def _request(self, server, question, scheduled_at):
+        loop = asyncio.get_running_loop()
+        dispatch_lag = loop.time() - scheduled_at
+        
+        # A new session per request, so requests never wait on each other's session lock
+        body = json.dumps({"question": question, "session_id": uuid.uuid4().hex}).encode("utf-8")
+        status, payload = await server.handle("POST", "/answer", body)
+        
+        return {
+            "status": status,
+            "latency": loop.time() - scheduled_at,
+            "queue_time": dispatch_lag + payload.get("queue_wait", 0.0),
+            "service_time": payload.get("latency", 0.0),
+            "cached": payload.get("cached", False)
+        }
+
+def _copy_database(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        os.remove(target)
+    if os.path.exists(source):
+        shutil.copyfile(source, target)
+
+def run_load_test(rate=LOAD_TEST_RATE, duration=LOAD_TEST_DURATION, levels=LOAD_TEST_CONCURRENCY_LEVELS):
+    """Run the same open-loop load at each concurrency limit and report where throughput stops improving."""
+    evaluation_dataset = load_evaluation_dataset()
+    if not evaluation_dataset:
+        print("No evaluation dataset found. Please create evaluation_dataset.json first.")
+        return
+    
+    load_test = LoadTest([item["question"] for item in evaluation_dataset], rate=rate, duration=duration)
+    load_test.prepare()
+    results = []
+    
+    for max_concurrency in levels:
+        print(f"\nConcurrency {max_concurrency}: {rate:g} req/s for {duration}s")
+        level = asyncio.run(load_test.run_level(max_concurrency))
+        results.append(level)
+        
+        latency = level["latency"]
+        print(f"  throughput {level['throughput']:.2f} req/s, errors {level['error_rate']:.1%}, "
+              f"p50 {latency.get('p50', 0):.2f}s p95 {latency.get('p95', 0):.2f}s "
+              f"p99 {latency.get('p99', 0):.2f}s p99.9 {latency.get('p99.9', 0):.2f}s, "
+              f"queue p95 {level['queue_time'].get('p95', 0):.2f}s")
+    
+    saturation = find_saturation(results)
+    capacity = max(level["throughput"] for level in results)
+    print(f"\nThroughput levels off at concurrency {saturation} ({capacity:.2f} req/s)")
+    if not any(level["kept_up"] for level in results):
+        print(f"No level kept up with {rate:g} req/s; {capacity:.2f} req/s is the server's capacity")
+    
+    report = {
+        "offered_rate": rate,
+        "duration_seconds": duration,
+        "saturation_concurrency": saturation,
+        "capacity": capacity,
+        "levels": results
+    }
+    
+    results_file = os.path.join(RESULTS_DIR, "load_test.json")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(results_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {results_file}")
+    
+    return report
\ No newline at end of file
@@ -0,0 +1,159 @@
+import atexit
+import queue
+import threading
+import time
+from config import LTM_WRITE_BATCH_SIZE, LTM_WRITE_MAX_WAIT, LTM_WRITE_MAX_ATTEMPTS
+
+class LTMWriteBehind:
+    """
+    Background worker that takes LTM updates off the answer path.
+    
+    Interactions are queued by the agent and drained in batches: extraction runs
+    on the worker thread and each batch is written to SQLite in one transaction.
+    A batch that fails is retried up to LTM_WRITE_MAX_ATTEMPTS times and then
+    written one interaction at a time; interactions that still fail are kept in
+    `failed` and counted in the metrics rather than dropped.
+    """
+    
+    def __init__(self, ltm, build_updates, batch_size=LTM_WRITE_BATCH_SIZE, max_wait=LTM_WRITE_MAX_WAIT):
+        self.ltm = ltm
+        self.build_updates = build_updates
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.failed = []
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "errors": 0,
+            "retries": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_batch_seconds": 0.0
+        }
+        
+        self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def submit(self, question, answer, retrieved_chunks):
+        # Held across the check and the put so nothing can be queued behind the shutdown marker
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("LTM write-behind queue is closed")
+            self._queue.put((question, answer, retrieved_chunks))
+        
+        with self._metrics_lock:
+            self._metrics["enqueued"] += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue.qsize())
+    
+    def flush(self):
+        """Block until every queued interaction has been written or given up on; returns how many failed in total."""
+        self._queue.join()
+        with self._metrics_lock:
+            return self._metrics["failed"]
+    
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        
+        atexit.unregister(self.close)
+        failed = self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        
+        if failed:
+            print(f"LTM write-behind closed with {failed} interactions not written; see LTMWriteBehind.failed")
+    
+    def queue_depth(self):
+        return self._queue.qsize()
+    
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self.queue_depth()
+        return metrics
+    
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        
+        batch = [first]
+        deadline = time.time() + self.max_wait
+        
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if item is None:
+                # Put the shutdown marker back so the loop exits after this batch
+                self._queue.task_done()
+                self._queue.put(None)
+                break
+            batch.append(item)
+        
+        return batch
+    
+    def _worker_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self._queue.task_done()
+                return
+            
+            start_time = time.time()
+            
+            try:
+                if not self._write_with_retries(batch):
+                    # Write what can be written so one bad interaction does not sink the rest
+                    for item in batch:
+                        if not self._write_with_retries([item], attempts=1):
+                            with self._metrics_lock:
+                                self.failed.append(item)
+                                self._metrics["failed"] += 1
+                
+                with self._metrics_lock:
+                    self._metrics["batches"] += 1
+                    self._metrics["last_batch_size"] = len(batch)
+                    self._metrics["last_batch_seconds"] = time.time() - start_time
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _write_with_retries(self, batch, attempts=LTM_WRITE_MAX_ATTEMPTS):
+        for attempt in range(attempts):
+            try:
+                facts, entities, relations = [], [], []
+                for question, answer, retrieved_chunks in batch:
+                    updates = self.build_updates(question, answer, retrieved_chunks)
+                    facts.extend(updates["facts"])
+                    entities.extend(updates["entities"])
+                    relations.extend(updates["relations"])
+                
+                self.ltm.save_batch(facts=facts, entities=entities, relations=relations)
+            except Exception as e:
+                print(f"Error writing LTM batch of {len(batch)} interactions (attempt {attempt + 1}/{attempts}): {e}")
+                with self._metrics_lock:
+                    self._metrics["errors"] += 1
+                    if attempt + 1 < attempts:
+                        self._metrics["retries"] += 1
+                if attempt + 1 < attempts:
+                    time.sleep(0.05 * 2 ** attempt)
+                continue
+            
+            with self._metrics_lock:
+                self._metrics["written"] += len(batch)
+            return True
+        return False
@@ -1,19 +1,51 @@
 import argparse
+import sys
 from data_ingestion import fetch_wikipedia_articles
 from run_experiments import run_all_experiments
+from retrieval_bench import run_retrieval_bench
 from visualize_results import visualize_all_results
+from memory import LongTermMemory
+from consolidation import LTMConsolidator
+from profiling import PROFILING_MODES, enable_profiling
+from config import (
+    SERVE_HOST, SERVE_PORT, SERVE_MAX_CONCURRENCY, RETRIEVAL_BENCH_MAX_K, BENCHMARK_SCALES,
+    LOAD_TEST_RATE, LOAD_TEST_DURATION, LOAD_TEST_CONCURRENCY_LEVELS, PROFILING_MODE
+)
 
 def main():
     parser = argparse.ArgumentParser(description="Agent Memory System with RAG")
     parser.add_argument(
         "--mode",
-        choices=["fetch", "experiment", "visualize", "all"],
+        choices=["fetch", "experiment", "retrieval-bench", "benchmark", "load-test", "visualize", "consolidate", "serve", "all"],
         default="all",
-        help="Mode to run: fetch articles, run experiments, visualize results, or all"
+        help="Mode to run: fetch articles, run experiments, benchmark retrieval only, run the offline micro-benchmarks, load test the agent, visualize results, consolidate LTM, serve the agent, or all"
     )
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the experiment results log, skipping queries already completed")
+    parser.add_argument("--max-k", type=int, default=RETRIEVAL_BENCH_MAX_K,
+                        help="Deepest rank scored in retrieval-bench mode")
+    parser.add_argument("--scales", type=int, nargs="+", default=BENCHMARK_SCALES,
+                        help="Synthetic data scales (multiples of today's size) in benchmark mode")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Save benchmark results as the baseline instead of comparing against it")
+    parser.add_argument("--rate", type=float, default=LOAD_TEST_RATE,
+                        help="Mean arrival rate in requests per second in load-test mode")
+    parser.add_argument("--duration", type=float, default=LOAD_TEST_DURATION,
+                        help="Seconds of arrivals per concurrency level in load-test mode")
+    parser.add_argument("--levels", type=int, nargs="+", default=LOAD_TEST_CONCURRENCY_LEVELS,
+                        help="Server concurrency limits swept in load-test mode")
+    parser.add_argument("--profile", nargs="?", const=PROFILING_MODE, choices=PROFILING_MODES,
+                        help="Profile ingestion, experiments and answers (sampling or cprofile) into results/profiles")
+    parser.add_argument("--host", default=SERVE_HOST, help="Host to bind in serve mode")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="Port to bind in serve mode")
+    parser.add_argument("--concurrency", type=int, default=SERVE_MAX_CONCURRENCY,
+                        help="Maximum answers generated at once in serve mode")
     
     args = parser.parse_args()
     
+    if args.profile:
+        enable_profiling(args.profile)
+    
     if args.mode == "fetch" or args.mode == "all":
         print("\n" + "="*60)
         print("FETCHING WIKIPEDIA ARTICLES")
@@ -24,7 +56,29 @@ def main():
         print("\n" + "="*60)
         print("RUNNING EXPERIMENTS")
         print("="*60)
-        run_all_experiments()
+        run_all_experiments(resume=args.resume)
+    
+    if args.mode == "retrieval-bench":
+        print("\n" + "="*60)
+        print("BENCHMARKING RETRIEVAL")
+        print("="*60)
+        run_retrieval_bench(max_k=args.max_k)
+    
+    if args.mode == "benchmark":
+        print("\n" + "="*60)
+        print("RUNNING MICRO-BENCHMARKS")
+        print("="*60)
+        from benchmarks import run_benchmarks
+        regressions = run_benchmarks(scales=args.scales, save_baseline=args.save_baseline)
+        if regressions:
+            sys.exit(1)
+    
+    if args.mode == "load-test":
+        print("\n" + "="*60)
+        print("LOAD TESTING THE AGENT")
+        print("="*60)
+        from load_test import run_load_test
+        run_load_test(rate=args.rate, duration=args.duration, levels=args.levels)
     
     if args.mode == "visualize" or args.mode == "all":
         print("\n" + "="*60)
@@ -32,6 +86,19 @@ def main():
         print("="*60)
         visualize_all_results()
     
+    if args.mode == "consolidate":
+        print("\n" + "="*60)
+        print("CONSOLIDATING LONG-TERM MEMORY")
+        print("="*60)
+        report = LTMConsolidator(LongTermMemory()).run()
+        for key, value in report.items():
+            print(f"{key}: {value}")
+    
+    if args.mode == "serve":
+        from server import serve
+        serve(host=args.host, port=args.port, max_concurrency=args.concurrency)
+        return
+    
     print("\n" + "="*60)
     print("DONE")
     print("="*60)
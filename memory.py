@@ -2,7 +2,14 @@ import sqlite3
 import json
 from datetime import datetime
 import tiktoken
-from config import LTM_DB_PATH, STM_TOKEN_BUDGET
+from config import LTM_DB_PATH, STM_TOKEN_BUDGET, GRAPH_TRAVERSAL_HOPS, GRAPH_CONTEXT_LIMIT, RELATION_WINDOW_CHARS
+from gazetteer import Gazetteer, load_topic_names
+from tracing import traced
+from collections import deque
+import asyncio
+import bisect
+import threading
+import queue
 import os
 import re
 
@@ -42,14 +49,220 @@ class ShortTermMemory:
             context.append(f"{msg['role'].upper()}: {msg['content']}")
         return "\n".join(context)
 
+class EntityGraph:
+    """
+    In-memory adjacency-list view of the entities and entity_relations tables.
+    
+    Loaded from SQLite and updated in place by LongTermMemory on its own writes;
+    it is reloaded when another connection has written since, so neighborhood
+    queries only touch the database to check the version.
+    """
+    
+    def __init__(self):
+        self.nodes = {}
+        self.edges = {}
+        self.adjacency = {}
+        self._name_index = {}
+        self._lock = threading.Lock()
+    
+    def load(self, db_path):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT id, name, type FROM entities")
+        entity_rows = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT e1.name, er.relation_type, e2.name, er.timestamp
+            FROM entity_relations er
+            JOIN entities e1 ON er.entity1_id = e1.id
+            JOIN entities e2 ON er.entity2_id = e2.id
+        """)
+        relation_rows = cursor.fetchall()
+        
+        conn.close()
+        
+        with self._lock:
+            self.nodes.clear()
+            self.edges.clear()
+            self.adjacency.clear()
+            self._name_index.clear()
+            
+            for entity_id, name, entity_type in entity_rows:
+                self._add_node(name, entity_type, entity_id)
+            for entity1, relation_type, entity2, timestamp in relation_rows:
+                self._add_edge(entity1, entity2, relation_type, timestamp)
+    
+    def add_entity(self, name, entity_type, entity_id=None):
+        with self._lock:
+            self._add_node(name, entity_type, entity_id)
+    
+    def add_relation(self, entity1, entity2, relation_type, timestamp):
+        with self._lock:
+            if entity1 in self.nodes and entity2 in self.nodes:
+                self._add_edge(entity1, entity2, relation_type, timestamp)
+    
+    def resolve(self, names):
+        """Map names to graph nodes case-insensitively, skipping unknown names."""
+        resolved = []
+        for name in names:
+            node = self._name_index.get(name.lower())
+            if node and node not in resolved:
+                resolved.append(node)
+        return resolved
+    
+    def neighborhood(self, seeds, hops=GRAPH_TRAVERSAL_HOPS, limit=GRAPH_CONTEXT_LIMIT):
+        """
+        Breadth-first traversal from the seed entities.
+        
+        Returns up to `limit` relations within `hops` of a seed, closest first and
+        most recent first within the same distance.
+        """
+        with self._lock:
+            start = self.resolve(seeds)
+            depth = {node: 0 for node in start}
+            frontier = deque(start)
+            found = []
+            seen_edges = set()
+            
+            while frontier:
+                node = frontier.popleft()
+                if depth[node] >= hops:
+                    continue
+                
+                for edge_key in self.adjacency.get(node, ()):
+                    if edge_key in seen_edges:
+                        continue
+                    seen_edges.add(edge_key)
+                    found.append((depth[node], edge_key))
+                    
+                    entity1, _, entity2 = edge_key
+                    neighbor = entity2 if entity1 == node else entity1
+                    if neighbor not in depth:
+                        depth[neighbor] = depth[node] + 1
+                        frontier.append(neighbor)
+            
+            # Closest edges first, newest first within the same distance
+            found.sort(key=lambda item: self.edges[item[1]], reverse=True)
+            found.sort(key=lambda item: item[0])
+            
+            relations = []
+            for _, (entity1, relation_type, entity2) in found[:limit]:
+                relations.append({
+                    "entity1": entity1,
+                    "entity1_type": self.nodes[entity1]["type"],
+                    "relation_type": relation_type,
+                    "entity2": entity2,
+                    "entity2_type": self.nodes[entity2]["type"],
+                    "timestamp": self.edges[(entity1, relation_type, entity2)]
+                })
+            return relations
+    
+    def _add_node(self, name, entity_type, entity_id):
+        node = self.nodes.setdefault(name, {"id": entity_id, "type": entity_type})
+        node["type"] = entity_type
+        if entity_id is not None:
+            node["id"] = entity_id
+        self._name_index[name.lower()] = name
+        self.adjacency.setdefault(name, set())
+    
+    def _add_edge(self, entity1, entity2, relation_type, timestamp):
+        edge_key = (entity1, relation_type, entity2)
+        if edge_key not in self.edges or self.edges[edge_key] < timestamp:
+            self.edges[edge_key] = timestamp
+        self.adjacency[entity1].add(edge_key)
+        self.adjacency[entity2].add(edge_key)
+
+class SQLitePool:
+    """
+    Reusable SQLite connections for one database file.
+    
+    connect() hands out an idle connection (or opens a new one) wrapped so that
+    close() returns it to the pool instead of closing it. At most `size` idle
+    connections are kept.
+    """
+    
+    def __init__(self, db_path, size):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._reused = 0
+        self._lock = threading.Lock()
+    
+    def connect(self):
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._reused += 1
+        except queue.Empty:
+            # Connections move between asyncio.to_thread workers, but only one thread uses each at a time
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with self._lock:
+                self._opened += 1
+        return _PooledConnection(conn, self)
+    
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+    
+    def get_stats(self):
+        with self._lock:
+            return {"size": self.size, "idle": self._idle.qsize(), "opened": self._opened, "reused": self._reused}
+
+class _PooledConnection:
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
 class LongTermMemory:
-    def __init__(self, db_path=LTM_DB_PATH):
+    def __init__(self, db_path=LTM_DB_PATH, pool_size=0):
         self.db_path = db_path
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._pool = SQLitePool(db_path, pool_size) if pool_size else None
         self._init_db()
+        
+        # The graph and cached prompt sections are tagged with the database version they were read at
+        self._graph = None
+        self._graph_version = None
+        self._graph_lock = threading.Lock()
+        
+        self._section_cache = {}
+        self._section_cache_version = None
+        self._cache_lock = threading.Lock()
+    
+    def _connect(self):
+        return self._pool.connect() if self._pool else sqlite3.connect(self.db_path)
+    
+    def get_pool_stats(self):
+        return self._pool.get_stats() if self._pool else {}
+    
+    def close(self):
+        if self._pool:
+            self._pool.close()
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -85,26 +298,40 @@ class LongTermMemory:
             )
         """)
         
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ltm_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_timestamp ON facts(timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_timestamp ON entities(timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_relations_timestamp ON entity_relations(timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_relations_entity1 ON entity_relations(entity1_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_relations_entity2 ON entity_relations(entity2_id)")
+        
         conn.commit()
         conn.close()
     
     def save_fact(self, content, source=None, salience=0.5, success_outcome=False):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
             INSERT INTO facts (content, source, salience, timestamp, success_outcome)
             VALUES (?, ?, ?, ?, ?)
         """, (content, source, salience, datetime.now().isoformat(), int(success_outcome)))
+        fact_id = cursor.lastrowid
         
+        self._bump_version(cursor)
         conn.commit()
-        fact_id = cursor.lastrowid
         conn.close()
         
         return fact_id
     
     def get_facts(self, limit=10, min_salience=0.0):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -130,7 +357,7 @@ class LongTermMemory:
         return facts
     
     def save_entity(self, name, entity_type, attributes=None):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         attributes_json = json.dumps(attributes) if attributes else None
@@ -151,13 +378,16 @@ class LongTermMemory:
             cursor.execute("SELECT id FROM entities WHERE name = ?", (name,))
             entity_id = cursor.fetchone()[0]
         
+        version = self._bump_version(cursor, entities_changed=True)
         conn.commit()
         conn.close()
         
+        self._update_graph(version, lambda graph: graph.add_entity(name, entity_type, entity_id))
+        
         return entity_id
     
     def get_entity(self, name):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -179,8 +409,59 @@ class LongTermMemory:
             }
         return None
     
+    def get_entities(self, limit=10):
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, name, type, attributes, timestamp
+            FROM entities
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (limit,))
+        
+        entities = []
+        for row in cursor.fetchall():
+            entities.append({
+                "id": row[0],
+                "name": row[1],
+                "type": row[2],
+                "attributes": json.loads(row[3]) if row[3] else None,
+                "timestamp": row[4]
+            })
+        
+        conn.close()
+        return entities
+    
+    def get_entity_names(self, after_id=0):
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, name, type
+            FROM entities
+            WHERE id > ?
+            ORDER BY id
+        """, (after_id,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def get_counts(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        counts = {}
+        for table in ["facts", "entities", "entity_relations"]:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        
+        conn.close()
+        return counts
+    
     def get_all_entities(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -209,26 +490,266 @@ class LongTermMemory:
         if not entity1 or not entity2:
             return None
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        timestamp = datetime.now().isoformat()
         cursor.execute("""
             INSERT INTO entity_relations (entity1_id, entity2_id, relation_type, timestamp)
             VALUES (?, ?, ?, ?)
-        """, (entity1["id"], entity2["id"], relation_type, datetime.now().isoformat()))
+        """, (entity1["id"], entity2["id"], relation_type, timestamp))
+        relation_id = cursor.lastrowid
         
+        version = self._bump_version(cursor)
         conn.commit()
-        relation_id = cursor.lastrowid
         conn.close()
         
+        self._update_graph(
+            version, lambda graph: graph.add_relation(entity1_name, entity2_name, relation_type, timestamp)
+        )
+        
         return relation_id
     
+    @traced("ltm.save_batch")
+    def save_batch(self, facts=None, entities=None, relations=None):
+        """
+        Write facts, entities and relations in a single transaction.
+        
+        Args:
+            facts: List of dicts with save_fact keyword arguments
+            entities: List of dicts with 'name', 'type' and 'attributes'
+            relations: List of dicts with 'entity1', 'entity2', 'relation_type' and an
+                optional 'fact' (save_fact keyword arguments) saved only if both entities exist
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        timestamp = datetime.now().isoformat()
+        
+        for entity in entities or []:
+            attributes_json = json.dumps(entity["attributes"]) if entity.get("attributes") else None
+            cursor.execute("""
+                INSERT INTO entities (name, type, attributes, timestamp)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    type = excluded.type,
+                    attributes = excluded.attributes,
+                    timestamp = excluded.timestamp
+            """, (entity["name"], entity["type"], attributes_json, timestamp))
+        
+        saved_relations = []
+        relation_facts = []
+        for relation in relations or []:
+            cursor.execute("""
+                INSERT INTO entity_relations (entity1_id, entity2_id, relation_type, timestamp)
+                SELECT e1.id, e2.id, ?, ?
+                FROM entities e1, entities e2
+                WHERE e1.name = ? AND e2.name = ?
+            """, (relation["relation_type"], timestamp, relation["entity1"], relation["entity2"]))
+            
+            if cursor.rowcount:
+                saved_relations.append(relation)
+                if relation.get("fact"):
+                    relation_facts.append(relation["fact"])
+        
+        for fact in list(facts or []) + relation_facts:
+            cursor.execute("""
+                INSERT INTO facts (content, source, salience, timestamp, success_outcome)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                fact["content"],
+                fact.get("source"),
+                fact.get("salience", 0.5),
+                timestamp,
+                int(fact.get("success_outcome", False))
+            ))
+        
+        version = self._bump_version(cursor, entities_changed=bool(entities))
+        conn.commit()
+        conn.close()
+        
+        def update(graph):
+            for entity in entities or []:
+                graph.add_entity(entity["name"], entity["type"])
+            for relation in saved_relations:
+                graph.add_relation(relation["entity1"], relation["entity2"], relation["relation_type"], timestamp)
+        
+        self._update_graph(version, update)
+    
+    def get_meta(self, key):
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT value FROM ltm_meta WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        
+        conn.close()
+        return row[0] if row else None
+    
+    def set_meta(self, key, value):
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("INSERT OR REPLACE INTO ltm_meta (key, value) VALUES (?, ?)", (key, value))
+        
+        conn.commit()
+        conn.close()
+    
+    def get_graph(self):
+        """Return the in-memory entity graph, reloading it whenever the database has changed since it was read."""
+        version = self.version
+        with self._graph_lock:
+            if self._graph is None or self._graph_version != version:
+                graph = EntityGraph()
+                graph.load(self.db_path)
+                self._graph = graph
+                self._graph_version = version
+            return self._graph
+    
+    def invalidate_graph(self):
+        with self._graph_lock:
+            self._graph = None
+            self._graph_version = None
+    
+    def mark_modified(self):
+        """Bump the database version after it was changed outside the save_* methods, e.g. by consolidation."""
+        conn = self._connect()
+        cursor = conn.cursor()
+        self._bump_version(cursor, entities_changed=True, entities_rewritten=True)
+        conn.commit()
+        conn.close()
+        
+        self.invalidate_graph()
+    
+    # Versions live in ltm_meta, so writes by other instances and processes invalidate this one's caches too
+    @property
+    def version(self):
+        return self._read_versions()["data_version"]
+    
+    @property
+    def entity_version(self):
+        return self._read_versions()["entity_version"]
+    
+    @property
+    def entity_epoch(self):
+        return self._read_versions()["entity_epoch"]
+    
+    def _read_versions(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT key, value FROM ltm_meta WHERE key IN ('data_version', 'entity_version', 'entity_epoch')"
+        )
+        versions = {key: int(value) for key, value in cursor.fetchall()}
+        conn.close()
+        return {key: versions.get(key, 0) for key in ("data_version", "entity_version", "entity_epoch")}
+    
+    def _bump_version(self, cursor, entities_changed=False, entities_rewritten=False):
+        """Bump the version counters inside the caller's write transaction; returns the new data version."""
+        keys = ["data_version"]
+        if entities_changed:
+            keys.append("entity_version")
+        if entities_rewritten:
+            keys.append("entity_epoch")
+        
+        for key in keys:
+            cursor.execute("""
+                INSERT INTO ltm_meta (key, value) VALUES (?, '1')
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """, (key,))
+        
+        cursor.execute("SELECT value FROM ltm_meta WHERE key = 'data_version'")
+        return int(cursor.fetchone()[0])
+    
+    def _update_graph(self, version, update):
+        # Held across the check and the update so a concurrent reload cannot publish a graph missing this write
+        with self._graph_lock:
+            if self._graph is not None and self._graph_version == version - 1:
+                update(self._graph)
+                self._graph_version = version
+    
+    @traced("ltm.get_prompt_sections")
+    def get_prompt_sections(self, question_entities=None, fact_limit=5, min_salience=0.3, entity_limit=10):
+        """
+        Rendered LTM prompt lines for facts, known entities and relationships.
+        
+        Each section is cached until the next write; relationships are cached per set
+        of question entities.
+        """
+        return {
+            "facts": self._facts_section(fact_limit, min_salience),
+            "entities": self._entities_section(entity_limit),
+            "relations": self._relations_section(question_entities)
+        }
+    
+    @traced("ltm.get_prompt_sections")
+    async def aget_prompt_sections(self, question_entities=None, fact_limit=5, min_salience=0.3, entity_limit=10):
+        """Async variant of get_prompt_sections that reads the three sections concurrently."""
+        facts, entities, relations = await asyncio.gather(
+            asyncio.to_thread(self._facts_section, fact_limit, min_salience),
+            asyncio.to_thread(self._entities_section, entity_limit),
+            asyncio.to_thread(self._relations_section, question_entities)
+        )
+        return {"facts": facts, "entities": entities, "relations": relations}
+    
+    @traced("ltm.facts")
+    def _facts_section(self, limit, min_salience):
+        return self._cached_section(
+            ("facts", limit, min_salience),
+            lambda: [f"- {fact['content']}" for fact in self.get_facts(limit=limit, min_salience=min_salience)]
+        )
+    
+    @traced("ltm.entities")
+    def _entities_section(self, limit):
+        return self._cached_section(
+            ("entities", limit),
+            lambda: [f"- {e['name']} ({e['type']})" for e in self.get_entities(limit=limit)]
+        )
+    
+    @traced("ltm.relations")
+    def _relations_section(self, question_entities):
+        return self._cached_section(
+            ("relations", tuple(sorted(question_entities or []))),
+            lambda: [
+                f"- {r['entity1']} {r['relation_type'].replace('_', ' ')} {r['entity2']}"
+                for r in self.get_related_relations(question_entities)
+            ]
+        )
+    
+    def _cached_section(self, key, render):
+        version = self.version
+        with self._cache_lock:
+            if version != self._section_cache_version:
+                self._section_cache.clear()
+                self._section_cache_version = version
+            cached = self._section_cache.get(key)
+        
+        if cached is None:
+            cached = render()
+            self._store_section(version, key, cached)
+        return cached
+    
+    def _store_section(self, version, key, value):
+        with self._cache_lock:
+            # A write landed while this section was being read; do not cache stale data
+            if version != self._section_cache_version:
+                return
+            if len(self._section_cache) >= 256:
+                self._section_cache.clear()
+            self._section_cache[key] = value
+    
+    def get_related_relations(self, entity_names, hops=GRAPH_TRAVERSAL_HOPS, limit=GRAPH_CONTEXT_LIMIT):
+        """Relations within `hops` of the named entities, read from the in-memory graph."""
+        if not entity_names:
+            return []
+        return self.get_graph().neighborhood(entity_names, hops=hops, limit=limit)
+    
     def get_entity_relations(self, limit=20):
         """
         Retrieve entity relationships with entity names.
         Returns list of dicts with entity names and relation types.
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -261,52 +782,89 @@ class LongTermMemory:
         return relations
     
     def clear(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("DELETE FROM entity_relations")
         cursor.execute("DELETE FROM entities")
         cursor.execute("DELETE FROM facts")
+        # The prebuilt graph is gone, so later prebuilds must not be skipped
+        cursor.execute("DELETE FROM ltm_meta WHERE key LIKE 'graph_prebuild:%'")
         
+        self._bump_version(cursor, entities_changed=True, entities_rewritten=True)
         conn.commit()
         conn.close()
+        
+        self.invalidate_graph()
 
 class EntityExtractor:
-    def __init__(self):
-        self.phenomenon_pattern = re.compile(
-            r'\b(green flash|fata morgana|brocken spectre|circumzenithal arc|'
-            r'blood falls|blood rain|lake nyos|gravity hill|skyquake|'
-            r'morning glory cloud|naga fireball|catatumbo lightning|brinicle|sailing stones)\b',
+    def __init__(self, window=RELATION_WINDOW_CHARS):
+        self.topic_names = load_topic_names()
+        self.gazetteer = Gazetteer([(name, "phenomenon") for name in self.topic_names])
+        self.location_pattern = re.compile(r'\b(?:in|at|near|from)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b')
+        self.person_pattern = re.compile(r'\b([A-Z][a-z]+\s+[A-Z][a-z]+)\b')
+        self.sentence_pattern = re.compile(r'[^.!?\n]+(?:[.!?]+|\n|$)')
+        self.trigger_pattern = re.compile(
+            r'\b(?:'
+            r'(?P<studied_by>(?:studied|discovered|researched) by)|'
+            r'(?P<study>studied|discovered|researched|investigated|observed|documented|studies|discovers|researches)|'
+            r'(?P<preposition>in|at|near|over|from)'
+            r')\b',
             re.IGNORECASE
         )
+        self.window = window
+        
+        self._sync_lock = threading.Lock()
+        self._synced_version = None
+        self._synced_epoch = None
+        self._last_entity_id = 0
+    
+    def sync(self, ltm):
+        """Add entities saved to LTM since the last sync to the gazetteer."""
+        with self._sync_lock:
+            version = ltm.entity_version
+            if version == self._synced_version:
+                return
+            
+            # Entities were deleted or rewritten in bulk; start again from the topics
+            if ltm.entity_epoch != self._synced_epoch:
+                self.gazetteer = Gazetteer([(name, "phenomenon") for name in self.topic_names])
+                self._last_entity_id = 0
+                self._synced_epoch = ltm.entity_epoch
+            
+            for entity_id, name, entity_type in ltm.get_entity_names(after_id=self._last_entity_id):
+                self.gazetteer.add(name, entity_type)
+                self._last_entity_id = max(self._last_entity_id, entity_id)
+            
+            self._synced_version = version
     
     def extract_from_text(self, text):
         entities = []
+        seen = set()
         
-        phenomena = self.phenomenon_pattern.findall(text)
-        for phenomenon in phenomena:
+        for _, _, name, entity_type in self.gazetteer.find(text):
+            if (name, entity_type) in seen:
+                continue
+            seen.add((name, entity_type))
             entities.append({
-                "name": phenomenon.title(),
-                "type": "phenomenon",
-                "attributes": {"mentioned_in": "conversation"}
+                "name": name,
+                "type": entity_type,
+                "attributes": {"mentioned_in": "conversation"} if entity_type == "phenomenon" else {}
             })
         
-        location_indicators = re.findall(
-            r'\b(?:in|at|near|from)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b',
-            text
-        )
-        for location in location_indicators:
-            if len(location.split()) <= 3:
+        for location in self.location_pattern.findall(text):
+            if len(location.split()) <= 3 and (location, "location") not in seen:
+                seen.add((location, "location"))
                 entities.append({
                     "name": location,
                     "type": "location",
                     "attributes": {}
                 })
         
-        scientist_pattern = re.compile(r'\b([A-Z][a-z]+\s+[A-Z][a-z]+)\b')
-        potential_scientists = scientist_pattern.findall(text)
-        for name in potential_scientists:
-            if name not in [e["name"] for e in entities]:
+        seen_names = {name for name, _ in seen}
+        for name in self.person_pattern.findall(text):
+            if name not in seen_names:
+                seen_names.add(name)
                 entities.append({
                     "name": name,
                     "type": "person",
@@ -319,56 +877,66 @@ class EntityExtractor:
         """
         Extract relationships between entities from text.
         Returns list of tuples: (entity1_name, entity2_name, relation_type)
+        
+        The text is split into sentences once and every entity mention is found in a
+        single gazetteer pass; relations are then decided from mention positions and the trigger
+        words between them, within a window of RELATION_WINDOW_CHARS.
         """
-        relationships = []
-        text_lower = text.lower()
-        
-        # Create lookup dictionaries for fast matching
-        phenomena = [e["name"] for e in entities if e["type"] == "phenomenon"]
-        locations = [e["name"] for e in entities if e["type"] == "location"]
-        persons = [e["name"] for e in entities if e["type"] == "person"]
-        
-        # Pattern 1: Phenomenon occurs/found/seen in/at/near location
-        location_relation_patterns = [
-            r'(occurs?|found|seen|visible|observed|appears?|happens?) (?:in|at|near|over) ',
-            r'(?:in|at|near|from) ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-        ]
-        
-        for phenomenon in phenomena:
-            phenomenon_lower = phenomenon.lower()
+        if not entities:
+            return []
+        
+        mention_gazetteer = Gazetteer([(e["name"], e["type"]) for e in entities])
+        
+        relationships = set()
+        
+        for sentence in self.sentence_pattern.finditer(text):
+            sentence_text = sentence.group()
             
-            # Find location relationships
-            for location in locations:
-                location_lower = location.lower()
-                
-                # Check various patterns
-                patterns_to_check = [
-                    f'{phenomenon_lower}.*(?:occurs?|found|seen|visible|observed|appears?|happens?).*(?:in|at|near|over).*{location_lower}',
-                    f'{phenomenon_lower}.*(?:in|at|near|from).*{location_lower}',
-                    f'(?:in|at|near).*{location_lower}.*{phenomenon_lower}',
-                ]
-                
-                for pattern in patterns_to_check:
-                    if re.search(pattern, text_lower):
-                        relationships.append((phenomenon, location, "occurs_in"))
-                        break
+            mentions = mention_gazetteer.find(sentence_text)
+            if len(mentions) < 2:
+                continue
             
-            # Find person relationships (studied, discovered, researched)
-            for person in persons:
-                person_lower = person.lower()
-                
-                patterns_to_check = [
-                    f'{person_lower}.*(?:studied|discovered|researched|investigated|observed|documented).*{phenomenon_lower}',
-                    f'{phenomenon_lower}.*(?:studied|discovered|researched) by.*{person_lower}',
-                    f'{person_lower}.*(?:studies|discovers|researches).*{phenomenon_lower}',
-                ]
-                
-                for pattern in patterns_to_check:
-                    if re.search(pattern, text_lower):
-                        relationships.append((person, phenomenon, "studied"))
+            triggers = {kind: [] for kind in self.trigger_pattern.groupindex}
+            for match in self.trigger_pattern.finditer(sentence_text):
+                triggers[match.lastgroup].append(match.start())
+            
+            for i, later in enumerate(mentions):
+                for j in range(i - 1, -1, -1):
+                    earlier = mentions[j]
+                    if later[0] - earlier[1] > self.window:
                         break
+                    relation = self._relate(earlier, later, triggers)
+                    if relation:
+                        relationships.add(relation)
         
-        # Remove duplicates
-        relationships = list(set(relationships))
+        return list(relationships)
+    
+    def _relate(self, earlier, later, triggers):
+        first_start, first_end, first_name, first_type = earlier
+        second_start, _, second_name, second_type = later
+        
+        # Phenomenon ... in/at/near/over/from ... location
+        if first_type == "phenomenon" and second_type == "location":
+            if _has_trigger(triggers["preposition"], first_end, second_start):
+                return (first_name, second_name, "occurs_in")
+        
+        # In/at/near ... location ... phenomenon
+        if first_type == "location" and second_type == "phenomenon":
+            if _has_trigger(triggers["preposition"], first_start - self.window, first_start):
+                return (second_name, first_name, "occurs_in")
+        
+        # Person ... studied/discovered/... phenomenon
+        if first_type == "person" and second_type == "phenomenon":
+            if _has_trigger(triggers["study"], first_end, second_start):
+                return (first_name, second_name, "studied")
+        
+        # Phenomenon ... studied/discovered/researched by ... person
+        if first_type == "phenomenon" and second_type == "person":
+            if _has_trigger(triggers["studied_by"], first_end, second_start):
+                return (second_name, first_name, "studied")
         
-        return relationships
\ No newline at end of file
+        return None
+
+def _has_trigger(positions, start, end):
+    index = bisect.bisect_left(positions, start)
+    return index < len(positions) and positions[index] < end
\ No newline at end of file
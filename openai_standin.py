@@ -0,0 +1,236 @@
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import httpx
+import numpy as np
+from config import (
+    STANDIN_SEED, STANDIN_LATENCY_SCALE, STANDIN_LATENCY_SIGMA, STANDIN_EMBEDDING_LATENCY_MS,
+    STANDIN_CHAT_TTFT_MS, STANDIN_CHAT_TOKEN_MS, STANDIN_RATE_LIMIT_PROBABILITY, STANDIN_RETRY_AFTER_SECONDS
+)
+
+DEFAULT_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536
+}
+
+class StandInTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    In-process replacement for the OpenAI embeddings and chat completions endpoints.
+    
+    Plugged into the OpenAI clients as their httpx transport. Embeddings are
+    feature-hashed bag-of-words vectors, answers are built from the prompt's
+    context section, and `usage` is filled from a word-level token count. Latencies
+    are drawn from lognormal distributions and a configurable share of requests
+    fail with 429 and a retry-after header. The clients are built with
+    max_retries=0, so those failures exercise ResilientCaller's retries and
+    circuit breaker rather than the SDK's.
+    """
+    
+    def __init__(self, seed=STANDIN_SEED, latency_scale=STANDIN_LATENCY_SCALE,
+                 rate_limit_probability=STANDIN_RATE_LIMIT_PROBABILITY):
+        self.latency_scale = latency_scale
+        self.rate_limit_probability = rate_limit_probability
+        
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"embeddings": 0, "chat_completions": 0, "rate_limited": 0, "not_found": 0}
+    
+    def handle_request(self, request):
+        response, delay = self._dispatch(request)
+        time.sleep(delay)
+        return response
+    
+    async def handle_async_request(self, request):
+        response, delay = self._dispatch(request)
+        await asyncio.sleep(delay)
+        return response
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+    
+    def _dispatch(self, request):
+        path = request.url.path
+        
+        if path.endswith("/embeddings"):
+            endpoint = "embeddings"
+        elif path.endswith("/chat/completions"):
+            endpoint = "chat_completions"
+        else:
+            self._count("not_found")
+            return _json_response(404, {"error": {"message": f"Unknown endpoint {path}", "type": "invalid_request_error"}}), 0.0
+        
+        with self._lock:
+            rate_limited = self._random.random() < self.rate_limit_probability
+        
+        if rate_limited:
+            self._count("rate_limited")
+            response = _json_response(429, {
+                "error": {
+                    "message": "Rate limit reached (stand-in)",
+                    "type": "rate_limit_error",
+                    "code": "rate_limit_exceeded"
+                }
+            }, headers={"retry-after": str(STANDIN_RETRY_AFTER_SECONDS)})
+            return response, self._latency(STANDIN_EMBEDDING_LATENCY_MS)
+        
+        self._count(endpoint)
+        body = json.loads(request.content or b"{}")
+        
+        if endpoint == "embeddings":
+            return self._embeddings(body), self._latency(STANDIN_EMBEDDING_LATENCY_MS)
+        return self._chat_completion(body)
+    
+    def _embeddings(self, body):
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        model = body.get("model", "text-embedding-3-small")
+        dimensions = body.get("dimensions") or DEFAULT_DIMENSIONS.get(model, 1536)
+        as_base64 = body.get("encoding_format") == "base64"
+        
+        data = []
+        for index, text in enumerate(texts):
+            vector = hash_embedding(text, model, dimensions)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        
+        prompt_tokens = sum(count_tokens(text) for text in texts)
+        return _json_response(200, {
+            "object": "list",
+            "data": data,
+            "model": model,
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+        })
+    
+    def _chat_completion(self, body):
+        model = body.get("model", "gpt-4o")
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        max_tokens = body.get("max_tokens") or 500
+        
+        pieces = re.findall(r'\s*\S+', canned_answer(prompt))
+        finish_reason = "length" if len(pieces) > max_tokens else "stop"
+        pieces = pieces[:max_tokens]
+        answer = "".join(pieces).strip()
+        
+        usage = {
+            "prompt_tokens": count_tokens(prompt),
+            "completion_tokens": len(pieces),
+            "total_tokens": count_tokens(prompt) + len(pieces)
+        }
+        completion_id = "chatcmpl-standin-" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:24]
+        created = int(time.time())
+        
+        ttft = self._latency(STANDIN_CHAT_TTFT_MS)
+        token_delay = STANDIN_CHAT_TOKEN_MS * self.latency_scale / 1000.0
+        
+        if not body.get("stream"):
+            return _json_response(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": finish_reason
+                }],
+                "usage": usage
+            }), ttft + token_delay * len(pieces)
+        
+        def chunk(delta, finish=None, chunk_usage=None, with_choice=True):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if with_choice else [],
+                "usage": chunk_usage
+            }
+        
+        events = [chunk({"role": "assistant", "content": ""})]
+        events.extend(chunk({"content": piece}) for piece in pieces)
+        events.append(chunk({}, finish=finish_reason))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(chunk(None, chunk_usage=usage, with_choice=False))
+        
+        stream = _EventStream(events, token_delay)
+        response = httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+        return response, ttft
+    
+    def _latency(self, median_ms):
+        with self._lock:
+            sample = self._random.lognormvariate(0.0, STANDIN_LATENCY_SIGMA)
+        return median_ms * sample * self.latency_scale / 1000.0
+    
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+class _EventStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Server-sent events emitted with a fixed delay between tokens."""
+    
+    def __init__(self, events, delay):
+        self.events = events
+        self.delay = delay
+    
+    def __iter__(self):
+        for index, event in enumerate(self.events):
+            if index and self.delay:
+                time.sleep(self.delay)
+            yield _sse(event)
+        yield b"data: [DONE]\n\n"
+    
+    async def __aiter__(self):
+        for index, event in enumerate(self.events):
+            if index and self.delay:
+                await asyncio.sleep(self.delay)
+            yield _sse(event)
+        yield b"data: [DONE]\n\n"
+
+def hash_embedding(text, model, dimensions, features_per_word=8):
+    """
+    Unit vector built by feature-hashing the words of the text.
+    
+    Identical across runs and processes, and texts that share words get similar
+    vectors, so retrieval against the stand-in still ranks lexical matches first.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    
+    for word in re.findall(r'\w+', text.lower()):
+        digest = hashlib.blake2b(f"{model}\x00{word}".encode("utf-8"), digest_size=4 * features_per_word).digest()
+        for i in range(features_per_word):
+            bucket = int.from_bytes(digest[4 * i:4 * i + 4], "little")
+            vector[bucket % dimensions] += 1.0 if bucket & 0x80000000 else -1.0
+    
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        # No words to hash; fall back to a vector seeded by the raw text
+        seed = int.from_bytes(hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+        norm = np.linalg.norm(vector)
+    return vector / norm
+
+def canned_answer(prompt):
+    """The first two sentences of the prompt's retrieved context, or a fixed fallback."""
+    context = prompt.split("Relevant Context:", 1)[1] if "Relevant Context:" in prompt else ""
+    context = context.split("\nQuestion:", 1)[0]
+    context = re.sub(r'\[Source \d+: [^\]]*\]', ' ', context)
+    
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', " ".join(context.split())) if s.strip()]
+    if not sentences:
+        return "I could not find enough information in the provided context to answer that."
+    return "Based on the provided context, " + " ".join(sentences[:2])
+
+def count_tokens(text):
+    return len(re.findall(r'\w+|[^\w\s]', text))
+
+def _sse(event):
+    return f"data: {json.dumps(event)}\n\n".encode("utf-8")
+
+def _json_response(status_code, payload, headers=None):
+    return httpx.Response(status_code, json=payload, headers=headers)
\ No newline at end of file
@@ -0,0 +1,284 @@
+import atexit
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from config import (
+    PROFILING_ENABLED, PROFILING_MODE, PROFILING_SAMPLE_INTERVAL, PROFILING_MEMORY, PROFILING_TRACEMALLOC_FRAMES,
+    PROFILING_TOP_ALLOCATIONS, PROFILING_TOP_FUNCTIONS, PROFILE_DIR
+)
+
+PROFILING_MODES = ("sampling", "cprofile")
+
+# Innermost frames of threads that are blocked rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+class StageProfiler:
+    """
+    CPU and memory profiles per named stage, accumulated over every call.
+    
+    In "sampling" mode a background thread records the stacks of all busy
+    threads every PROFILING_SAMPLE_INTERVAL seconds and credits them to every
+    stage active at the time, giving one collapsed-stack (flame graph) file per
+    stage. In "cprofile" mode the thread that enters a stage is profiled with
+    cProfile until it leaves; stages entered inside another one on the same
+    thread are counted in the outer stage's profile. With PROFILING_MEMORY on,
+    tracemalloc reports each stage's peak traced memory and the source lines
+    whose allocations grew the most while it ran.
+    """
+    
+    def __init__(self, mode=PROFILING_MODE, interval=PROFILING_SAMPLE_INTERVAL, memory=PROFILING_MEMORY):
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        
+        self.mode = mode
+        self.interval = interval
+        self.memory = memory
+        
+        self._active = {}
+        self._calls = {}
+        self._samples = {}
+        self._stats = {}
+        self._peaks = {}
+        self._snapshots = {}
+        self._allocations = {}
+        self._started_tracemalloc = False
+        self._sampler = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name):
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit(name)
+    
+    def write(self, directory=PROFILE_DIR):
+        """Write every stage's reports, suffixed with the process ID so pool workers do not overwrite each other."""
+        with self._lock:
+            stages = sorted(self._calls)
+            samples = {name: dict(counts) for name, counts in self._samples.items()}
+            stats = dict(self._stats)
+            peaks = dict(self._peaks)
+            allocations = {name: dict(sizes) for name, sizes in self._allocations.items()}
+            calls = dict(self._calls)
+        
+        if not stages:
+            return []
+        
+        os.makedirs(directory, exist_ok=True)
+        pid = os.getpid()
+        written = []
+        
+        for name in stages:
+            prefix = os.path.join(directory, f"{name}.{pid}")
+            
+            if samples.get(name):
+                with open(f"{prefix}.folded", 'w', encoding='utf-8') as f:
+                    for stack, count in sorted(samples[name].items(), key=lambda item: -item[1]):
+                        f.write(f"{stack} {count}\n")
+                written.append(f"{prefix}.folded")
+            
+            if name in stats:
+                stats[name].dump_stats(f"{prefix}.prof")
+                report = io.StringIO()
+                pstats.Stats(f"{prefix}.prof", stream=report).sort_stats("cumulative").print_stats(PROFILING_TOP_FUNCTIONS)
+                with open(f"{prefix}.txt", 'w', encoding='utf-8') as f:
+                    f.write(report.getvalue())
+                written.extend([f"{prefix}.prof", f"{prefix}.txt"])
+            
+            if name in peaks:
+                with open(f"{prefix}.memory.txt", 'w', encoding='utf-8') as f:
+                    f.write(f"{name}: {calls[name]} calls, peak traced memory {peaks[name] / 1e6:.2f} MB\n\n")
+                    f.write("Largest allocation growth by line:\n")
+                    top = sorted(allocations.get(name, {}).items(), key=lambda item: -item[1])
+                    for location, size in top[:PROFILING_TOP_ALLOCATIONS]:
+                        f.write(f"{size / 1e6:>+10.3f} MB  {location}\n")
+                written.append(f"{prefix}.memory.txt")
+        
+        print(f"Wrote {len(written)} profile files for {len(stages)} stages to {directory}")
+        return written
+    
+    def _enter(self, name):
+        with self._lock:
+            self._calls[name] = self._calls.get(name, 0) + 1
+            first = name not in self._active
+            
+            if self.memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(PROFILING_TRACEMALLOC_FRAMES)
+                    self._started_tracemalloc = True
+                # Credit the peak so far to the stages already running before resetting it for this one
+                self._record_peak()
+                tracemalloc.reset_peak()
+                if first:
+                    self._snapshots[name] = _take_snapshot()
+            
+            self._active[name] = self._active.get(name, 0) + 1
+            
+            if self.mode == "sampling" and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+                self._sampler.start()
+        
+        if self.mode == "cprofile":
+            depth = getattr(self._local, "depth", 0)
+            if depth == 0:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler already owns this thread
+                    profiler = None
+                self._local.profiler = profiler
+                self._local.stage = name
+            self._local.depth = depth + 1
+    
+    def _exit(self, name):
+        if self.mode == "cprofile":
+            self._local.depth -= 1
+            if self._local.depth == 0 and self._local.profiler is not None:
+                self._local.profiler.disable()
+                self._add_stats(self._local.stage, self._local.profiler)
+                self._local.profiler = None
+        
+        with self._lock:
+            if self.memory:
+                self._record_peak()
+            
+            self._active[name] -= 1
+            if self._active[name]:
+                return
+            del self._active[name]
+            
+            if self.memory and name in self._snapshots:
+                before = self._snapshots.pop(name)
+                after = _take_snapshot()
+                sizes = self._allocations.setdefault(name, {})
+                for diff in after.compare_to(before, "lineno"):
+                    if diff.size_diff:
+                        location = str(diff.traceback)
+                        sizes[location] = sizes.get(location, 0) + diff.size_diff
+            
+            if not self._active and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+    
+    def _record_peak(self):
+        _, peak = tracemalloc.get_traced_memory()
+        for name in self._active:
+            self._peaks[name] = max(self._peaks.get(name, 0), peak)
+    
+    def _add_stats(self, name, profiler):
+        with self._lock:
+            if name in self._stats:
+                self._stats[name].add(profiler)
+            else:
+                self._stats[name] = pstats.Stats(profiler)
+    
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                continue
+            
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                _collapse(frame, thread_names.get(thread_id, str(thread_id)))
+                for thread_id, frame in sys._current_frames().items()
+                if thread_id != own_id and not _is_idle(frame)
+            ]
+            
+            with self._lock:
+                for name in active:
+                    counts = self._samples.setdefault(name, {})
+                    for stack in stacks:
+                        counts[stack] = counts.get(stack, 0) + 1
+
+_profiler = None
+
+def enable_profiling(mode=PROFILING_MODE):
+    """Turn profiling on for this process and for worker processes it spawns later."""
+    global _profiler
+    if _profiler is None:
+        atexit.register(write_profiles)
+    if _profiler is None or _profiler.mode != mode:
+        _profiler = StageProfiler(mode=mode)
+    
+    # Spawned workers re-read the config, so they profile their own stages too
+    os.environ["PROFILING_ENABLED"] = "true"
+    os.environ["PROFILING_MODE"] = mode
+    return _profiler
+
+def write_profiles(directory=PROFILE_DIR):
+    if _profiler is not None:
+        return _profiler.write(directory)
+    return []
+
+@contextmanager
+def profile_stage(name):
+    if _profiler is None:
+        yield
+        return
+    
+    with _profiler.stage(name):
+        yield
+
+def profiled(name):
+    """Decorator that profiles a function or coroutine function as stage `name`; a no-op while profiling is off."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _profiler is None:
+                    return await func(*args, **kwargs)
+                with _profiler.stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _take_snapshot():
+    # Leave out the profilers' own bookkeeping
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, module.__file__) for module in (cProfile, pstats, tracemalloc, sys.modules[__name__])
+    ])
+
+def _collapse(frame, thread_name):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+def _is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+if PROFILING_ENABLED:
+    enable_profiling(PROFILING_MODE)
\ No newline at end of file
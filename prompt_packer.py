@@ -0,0 +1,70 @@
+import heapq
+import tiktoken
+from config import PROMPT_TOKEN_BUDGET, PROMPT_SECTION_WEIGHTS, PROMPT_RANK_DECAY
+
+class PromptPacker:
+    """
+    Fits prompt sections into a fixed input-token budget.
+    
+    Every item competes for the budget on its marginal value per token, where
+    value is the section weight discounted by the item's rank within its section.
+    Items are admitted greedily until nothing else fits.
+    """
+    
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET, weights=PROMPT_SECTION_WEIGHTS, rank_decay=PROMPT_RANK_DECAY):
+        self.budget = budget
+        self.weights = weights
+        self.rank_decay = rank_decay
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+    
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text))
+    
+    def pack(self, sections, fixed_parts):
+        """
+        Select items from each section within the budget.
+        
+        `sections` maps a section name to {"title", "items", "newest_first"} with
+        items in display order; `newest_first` ranks the last item highest.
+        `fixed_parts` are always included and paid for first. Returns the selected
+        item indices per section (in display order) and the tokens each section used.
+        """
+        fixed_tokens = sum(self.count_tokens(part) for part in fixed_parts)
+        remaining = self.budget - fixed_tokens
+        
+        candidates = []
+        for name, section in sections.items():
+            weight = self.weights.get(name, 0.0)
+            items = section["items"]
+            
+            for index, item in enumerate(items):
+                rank = len(items) - 1 - index if section.get("newest_first") else index
+                # One extra token for the separator between items
+                cost = self.count_tokens(item) + 1
+                value = weight * (self.rank_decay ** rank)
+                candidates.append((-value / cost, name, rank, index, cost))
+        
+        heapq.heapify(candidates)
+        
+        selected = {name: [] for name in sections}
+        usage = {name: 0 for name in sections}
+        
+        while candidates and remaining > 0:
+            _, name, _, index, cost = heapq.heappop(candidates)
+            
+            if not selected[name]:
+                cost += self.count_tokens(sections[name]["title"])
+            
+            if cost > remaining:
+                continue
+            
+            selected[name].append(index)
+            usage[name] += cost
+            remaining -= cost
+        
+        for name in selected:
+            selected[name].sort()
+        
+        usage["fixed"] = fixed_tokens
+        usage["total"] = self.budget - remaining
+        return selected, usage
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from config import OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT
+
+class TokenBucketLimiter:
+    """
+    Request and token buckets matching the provider's per-minute limits.
+    
+    Callers reserve one request and an estimated token count before each call and
+    settle the estimate against the reported usage afterwards. A caller that does
+    not fit sleeps until the buckets should have refilled and then tries again.
+    The bucket state is guarded by a thread lock that is never held across an
+    await, so one limiter can be shared by agents on different event loops and
+    threads.
+    """
+    
+    def __init__(self, requests_per_minute=OPENAI_RPM_LIMIT, tokens_per_minute=OPENAI_TPM_LIMIT):
+        self.request_capacity = requests_per_minute
+        self.token_capacity = tokens_per_minute
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._waited_seconds = 0.0
+        self._acquired = 0
+    
+    async def acquire(self, tokens):
+        """Wait for one request slot and `tokens` tokens; returns the number of tokens reserved."""
+        # A single call larger than the bucket would never fit; let it through once the bucket is full
+        tokens = min(tokens, self.token_capacity)
+        
+        while True:
+            with self._lock:
+                self._refill()
+                
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    self._acquired += 1
+                    return tokens
+                
+                wait = max(
+                    (1 - self._requests) / self.request_rate,
+                    (tokens - self._tokens) / self.token_rate
+                )
+                self._waited_seconds += wait
+            
+            await asyncio.sleep(wait)
+    
+    def settle(self, estimated_tokens, actual_tokens):
+        """Return over-reserved tokens to the bucket or charge the shortfall."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.token_capacity, self._tokens + estimated_tokens - actual_tokens)
+    
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "acquired": self._acquired,
+                "waited_seconds": self._waited_seconds,
+                "available_requests": self._requests,
+                "available_tokens": self._tokens
+            }
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate)
\ No newline at end of file
@@ -0,0 +1,353 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import numpy as np
+import openai
+from config import (
+    RESILIENCE_MAX_ATTEMPTS, RESILIENCE_BASE_DELAY, RESILIENCE_MAX_DELAY, HEDGE_REQUESTS,
+    HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+)
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive upstream failures.
+    
+    Once open, calls are rejected until `reset_seconds` have passed; then a
+    single trial call is let through and its outcome closes or reopens the circuit.
+    """
+    
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._times_opened = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+    
+    def allow(self):
+        with self._lock:
+            if self._state == "closed":
+                return True
+            
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = "half_open"
+                self._trial_in_flight = False
+            
+            if self._state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._times_opened += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+    
+    def release_trial(self):
+        """Let another trial through after one ended without an outcome, e.g. when it was cancelled."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def get_metrics(self):
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures, "times_opened": self._times_opened}
+
+class ResilientCaller:
+    """
+    Retry, deadline, hedging and circuit-breaking policy for one upstream.
+    
+    `fn` must accept a `timeout` keyword (the OpenAI SDK methods do); each attempt
+    gets the smaller of `timeout` and what is left of `deadline`. Retryable errors
+    are retried with full-jitter exponential backoff, waiting at least as long as
+    the server's retry-after. With hedging on, a duplicate request is sent once
+    the first has been outstanding longer than the recent p95 latency, and the
+    first successful response wins.
+    """
+    
+    def __init__(self, name, timeout, deadline, max_attempts=RESILIENCE_MAX_ATTEMPTS,
+                 base_delay=RESILIENCE_BASE_DELAY, max_delay=RESILIENCE_MAX_DELAY, hedge=HEDGE_REQUESTS,
+                 breaker=None):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        
+        self._latencies = deque(maxlen=500)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "short_circuited": 0
+        }
+    
+    def call(self, fn, *args, hedge=None, **kwargs):
+        deadline_at = time.monotonic() + self.deadline
+        hedge = self.hedge if hedge is None else hedge
+        self._count("calls")
+        attempt = 0
+        
+        while True:
+            attempt_timeout = self._before_attempt(deadline_at)
+            start = time.perf_counter()
+            
+            try:
+                if hedge and self.hedge_delay() is not None:
+                    result = self._call_hedged(fn, args, kwargs, attempt_timeout)
+                else:
+                    result = fn(*args, timeout=attempt_timeout, **kwargs)
+            except Exception as e:
+                attempt += 1
+                delay = self._after_failure(e, attempt, deadline_at)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            
+            self._after_success(time.perf_counter() - start, streaming=kwargs.get("stream", False))
+            return result
+    
+    async def acall(self, fn, *args, hedge=None, **kwargs):
+        deadline_at = time.monotonic() + self.deadline
+        hedge = self.hedge if hedge is None else hedge
+        self._count("calls")
+        attempt = 0
+        
+        while True:
+            attempt_timeout = self._before_attempt(deadline_at)
+            start = time.perf_counter()
+            
+            try:
+                if hedge and self.hedge_delay() is not None:
+                    attempt_call = self._acall_hedged(fn, args, kwargs, attempt_timeout)
+                else:
+                    attempt_call = fn(*args, timeout=attempt_timeout, **kwargs)
+                result = await asyncio.wait_for(attempt_call, attempt_timeout)
+            except Exception as e:
+                attempt += 1
+                delay = self._after_failure(e, attempt, deadline_at)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancellation records neither outcome; without this a half-open circuit would never trial again
+                self.breaker.release_trial()
+                raise
+            
+            self._after_success(time.perf_counter() - start, streaming=kwargs.get("stream", False))
+            return result
+    
+    def hedge_delay(self):
+        """Recent p95 latency, or None until enough calls have been observed."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return float(np.percentile(self._latencies, HEDGE_PERCENTILE))
+    
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["hedge_delay"] = self.hedge_delay()
+        metrics["circuit"] = self.breaker.get_metrics()
+        return metrics
+    
+    def _before_attempt(self, deadline_at):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            self._count("timeouts")
+            raise TimeoutError(f"{self.name} call exceeded its {self.deadline}s deadline")
+        return min(self.timeout, remaining)
+    
+    def _after_success(self, latency, streaming=False):
+        self.breaker.record_success()
+        with self._lock:
+            # A stream returns as soon as its headers arrive, which would drag the hedge delay down
+            if not streaming:
+                self._latencies.append(latency)
+            self._metrics["successes"] += 1
+    
+    def _after_failure(self, error, attempt, deadline_at):
+        """Return the delay before the next attempt, or re-raise when the call should not be retried."""
+        if isinstance(error, CircuitOpenError):
+            raise error
+        
+        if not is_retryable(error):
+            # The upstream answered; a bad request says nothing about its health
+            self.breaker.record_success()
+            self._count("failures")
+            raise error
+        
+        self.breaker.record_failure()
+        if isinstance(error, (TimeoutError, openai.APITimeoutError)):
+            self._count("timeouts")
+        
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        
+        if attempt >= self.max_attempts or time.monotonic() + delay >= deadline_at:
+            self._count("failures")
+            raise error
+        
+        self._count("retries")
+        return delay
+    
+    def _call_hedged(self, fn, args, kwargs, timeout):
+        executor = self._get_executor()
+        
+        def submit():
+            # Keep the caller's context (e.g. the active trace) in the worker thread
+            return executor.submit(contextvars.copy_context().run, fn, *args, timeout=timeout, **kwargs)
+        
+        primary = submit()
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done:
+            return primary.result()
+        
+        self._count("hedges")
+        backup = submit()
+        
+        error = None
+        for future in as_completed([primary, backup]):
+            if future.exception() is None:
+                if future is backup:
+                    self._count("hedge_wins")
+                return future.result()
+            error = future.exception()
+        raise error
+    
+    async def _acall_hedged(self, fn, args, kwargs, timeout):
+        primary = asyncio.ensure_future(fn(*args, timeout=timeout, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+        if done:
+            return primary.result()
+        
+        self._count("hedges")
+        backup = asyncio.ensure_future(fn(*args, timeout=timeout, **kwargs))
+        pending = {primary, backup}
+        error = None
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix=f"{self.name}-hedge")
+            return self._executor
+    
+    def _count(self, key):
+        with self._lock:
+            self._metrics[key] += 1
+
+_callers = {}
+_breakers = {}
+_callers_lock = threading.Lock()
+
+def get_resilient_caller(name, timeout, deadline, upstream=None):
+    """
+    Process-wide caller per name, so every client of it shares latency stats.
+    
+    Callers with the same `upstream` (default: their name) share one circuit
+    breaker, so differently shaped calls to one endpoint can keep separate
+    latency stats while still failing fast together.
+    """
+    with _callers_lock:
+        if name not in _callers:
+            breaker = _breakers.setdefault(upstream or name, CircuitBreaker())
+            _callers[name] = ResilientCaller(name, timeout=timeout, deadline=deadline, breaker=breaker)
+        return _callers[name]
+
+def get_resilience_metrics():
+    with _callers_lock:
+        callers = dict(_callers)
+    return {name: caller.get_metrics() for name, caller in callers.items()}
+
+def resilience_delta(before, after):
+    """Counters accumulated between two get_resilience_metrics() snapshots; the circuit state and hedge delay are `after`'s."""
+    delta = {}
+    for name, metrics in after.items():
+        previous = before.get(name, {})
+        delta[name] = {
+            key: value if key in ("hedge_delay", "circuit") else value - previous.get(key, 0)
+            for key, value in metrics.items()
+        }
+        delta[name]["circuit"] = dict(
+            metrics["circuit"],
+            times_opened=metrics["circuit"]["times_opened"] - previous.get("circuit", {}).get("times_opened", 0)
+        )
+    return delta
+
+def is_retryable(error):
+    if isinstance(error, (TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date values are rare from this API; fall back to plain backoff
+        return None
+    return None
\ No newline at end of file
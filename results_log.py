@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from evaluation import aggregate_metrics
+from config import RESULTS_LOG_PATH
+
+class ResultsLog:
+    """
+    Append-only JSONL log of experiment results.
+    
+    Every scored query is a "query" record keyed by (experiment, question), and
+    every finished experiment an "experiment" record naming its configuration and
+    the experiment whose queries it shares. Each line is written with a single
+    O_APPEND write, so planner workers can append to one log concurrently, and a
+    line cut short by a crash is skipped when reading.
+    """
+    
+    def __init__(self, path=RESULTS_LOG_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    def start(self, resume=False):
+        """Continue the existing log when resuming; otherwise move it aside and start a new one."""
+        if not os.path.exists(self.path):
+            return
+        
+        if resume:
+            with open(self.path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    # Terminate a line left incomplete by a crash so the next record starts cleanly
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+            print(f"Resuming from {self.path}")
+        else:
+            root, extension = os.path.splitext(self.path)
+            archived = f"{root}.{int(time.time())}{extension}"
+            os.replace(self.path, archived)
+            print(f"Previous results log moved to {archived}")
+    
+    def append(self, record):
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def append_query(self, experiment, result):
+        self.append({"type": "query", "experiment": experiment, **result})
+    
+    def append_experiment(self, config_name, source, chunk_config, embedding_config, memory_config, metrics=None):
+        self.append({
+            "type": "experiment",
+            "config_name": config_name,
+            "source": source,
+            "chunk_config": chunk_config,
+            "embedding_config": embedding_config,
+            "memory_config": memory_config,
+            "metrics": metrics or {},
+            "timestamp": time.time()
+        })
+    
+    def records(self, record_type=None, experiment=None):
+        if not os.path.exists(self.path):
+            return
+        
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                
+                if record_type and record.get("type") != record_type:
+                    continue
+                if experiment and record.get("experiment") != experiment:
+                    continue
+                yield record
+    
+    def completed_questions(self, experiment):
+        return {record["question"] for record in self.records("query", experiment)}
+    
+    def query_results(self, experiment):
+        """Logged query results of one experiment; a query logged twice keeps its latest result."""
+        results = {}
+        for record in self.records("query", experiment):
+            record.pop("type")
+            record.pop("experiment")
+            results[record["question"]] = record
+        return list(results.values())
+    
+    def experiments(self):
+        latest = {}
+        for record in self.records("experiment"):
+            latest[record["config_name"]] = record
+        return list(latest.values())
+    
+    def summaries(self, include_results=False, order=None):
+        """
+        Yield each logged experiment with metrics aggregated from its query records, one at a time.
+        
+        Experiments come in the order they finished unless `order` lists config names to sort by.
+        """
+        experiments = self.experiments()
+        if order:
+            experiments.sort(key=lambda experiment: order.index(experiment["config_name"])
+                             if experiment["config_name"] in order else len(order))
+        
+        for experiment in experiments:
+            results = self.query_results(experiment["source"])
+            
+            aggregated_metrics = aggregate_metrics(results)
+            aggregated_metrics.update(experiment["metrics"])
+            
+            summary = {
+                "config_name": experiment["config_name"],
+                "chunk_config": experiment["chunk_config"],
+                "embedding_config": experiment["embedding_config"],
+                "memory_config": experiment["memory_config"],
+                "num_queries": len(results),
+                "aggregated_metrics": aggregated_metrics
+            }
+            if include_results:
+                summary["results"] = results
+            yield summary
+    
+    def export_json(self, filepath, order=None):
+        """Write all experiments with their per-query results as one JSON array, one experiment in memory at a time."""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        count = 0
+        
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for summary in self.summaries(include_results=True, order=order):
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(summary, indent=2, default=float))
+                count += 1
+            f.write("\n]")
+        
+        print(f"Exported {count} experiments to {filepath}")
\ No newline at end of file
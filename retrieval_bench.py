@@ -0,0 +1,148 @@
+import json
+import os
+import time
+import numpy as np
+from data_ingestion import load_corpus
+from evaluation import load_evaluation_dataset
+from run_experiments import EXPERIMENTS, chunk_corpus, build_vector_store, collection_name_for
+from config import CHUNK_CONFIGS, EMBEDDING_CONFIGS, RESULTS_DIR, RETRIEVAL_BENCH_MAX_K
+
+REPORTED_KS = (1, 3, 5, 10)
+
+def retrieval_metrics_at_k(relevance, num_relevant):
+    """
+    Hit rate, MRR, recall and nDCG at every k up to the number of columns.
+    
+    `relevance` is a boolean (queries x K) matrix marking retrieved results that
+    are gold, `num_relevant` the number of gold results per query. Gains are
+    binary. Returns one array of length K per metric, averaged over queries.
+    """
+    relevance = np.asarray(relevance, dtype=bool)
+    num_relevant = np.asarray(num_relevant, dtype=float)
+    ks = np.arange(1, relevance.shape[1] + 1)
+    
+    hits_so_far = np.cumsum(relevance, axis=1)
+    
+    # Position of the first relevant result, or K when there is none
+    first_relevant = np.where(relevance.any(axis=1), relevance.argmax(axis=1), relevance.shape[1])
+    reciprocal_rank = np.where(first_relevant[:, None] < ks[None, :], 1.0 / (first_relevant[:, None] + 1), 0.0)
+    
+    discounts = 1.0 / np.log2(ks + 1)
+    dcg = np.cumsum(relevance * discounts, axis=1)
+    ideal_hits = np.minimum(num_relevant[:, None], ks[None, :]).astype(int)
+    idcg = np.concatenate([[0.0], np.cumsum(discounts)])[ideal_hits]
+    
+    return {
+        "hit_rate": (hits_so_far > 0).mean(axis=0),
+        "mrr": reciprocal_rank.mean(axis=0),
+        "recall": (hits_so_far / num_relevant[:, None]).mean(axis=0),
+        "ndcg": (dcg / idcg).mean(axis=0)
+    }
+
+def bench_index(vector_store, evaluation_dataset, chunking_key, max_k=RETRIEVAL_BENCH_MAX_K):
+    """Retrieve the top `max_k` chunks for every question in one batch and score every k up to `max_k`."""
+    items = [item for item in evaluation_dataset if item.get("gold_chunk_ids", {}).get(chunking_key)]
+    if not items:
+        return None
+    
+    start_time = time.time()
+    query_embeddings = vector_store.embedding_generator.generate([item["question"] for item in items])
+    if len(items) == 1:
+        query_embeddings = [query_embeddings]
+    embed_seconds = time.time() - start_time
+    
+    start_time = time.time()
+    retrieved = vector_store.search_batch(
+        [item["question"] for item in items],
+        top_k=max_k,
+        query_embeddings=query_embeddings
+    )
+    query_seconds = time.time() - start_time
+    
+    # Collections smaller than max_k return fewer results; the missing ranks count as misses
+    relevance = np.zeros((len(items), max_k), dtype=bool)
+    for row, (item, chunks) in enumerate(zip(items, retrieved)):
+        gold = set(item["gold_chunk_ids"][chunking_key])
+        relevance[row, :len(chunks)] = [chunk["id"] in gold for chunk in chunks]
+    
+    num_relevant = [len(set(item["gold_chunk_ids"][chunking_key])) for item in items]
+    curves = retrieval_metrics_at_k(relevance, num_relevant)
+    
+    return {
+        "queries": len(items),
+        "skipped_without_gold": len(evaluation_dataset) - len(items),
+        "max_k": max_k,
+        "embed_seconds": embed_seconds,
+        "query_seconds": query_seconds,
+        "curves": {metric: values.tolist() for metric, values in curves.items()}
+    }
+
+def run_retrieval_bench(max_k=RETRIEVAL_BENCH_MAX_K, experiments=EXPERIMENTS):
+    """
+    Score retrieval alone for every distinct (chunking, embedding) pair in `experiments`.
+    
+    No completions are requested; the only API calls are embeddings for the
+    questions and for indexes that do not exist yet. Indexes are shared with
+    the experiment runs.
+    """
+    evaluation_dataset = load_evaluation_dataset()
+    if not evaluation_dataset:
+        print("No evaluation dataset found. Please create evaluation_dataset.json first.")
+        return
+    
+    corpus = load_corpus()
+    chunks_by_config = {}
+    results = []
+    seen = set()
+    
+    for experiment in experiments:
+        key = (experiment["chunk"], experiment["embedding"])
+        if key in seen:
+            continue
+        seen.add(key)
+        
+        chunk_config = CHUNK_CONFIGS[experiment["chunk"]]
+        embedding_config = EMBEDDING_CONFIGS[experiment["embedding"]]
+        
+        if experiment["chunk"] not in chunks_by_config:
+            chunks_by_config[experiment["chunk"]] = chunk_corpus(corpus, chunk_config)
+        
+        vector_store = build_vector_store(
+            chunks_by_config[experiment["chunk"]],
+            embedding_config,
+            collection_name_for(experiment["config_name"], chunk_config)
+        )
+        
+        chunking_key = f"{chunk_config['strategy']}_{chunk_config['size']}"
+        bench = bench_index(vector_store, evaluation_dataset, chunking_key, max_k=max_k)
+        if bench is None:
+            print(f"No gold chunk IDs for {chunking_key}; skipping")
+            continue
+        
+        results.append({
+            "chunk": experiment["chunk"],
+            "embedding": experiment["embedding"],
+            "chunk_config": chunk_config,
+            "embedding_config": embedding_config,
+            **bench
+        })
+    
+    _print_table(results)
+    
+    results_file = os.path.join(RESULTS_DIR, "retrieval_bench.json")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(results_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {results_file}")
+    
+    return results
+
+def _print_table(results):
+    for result in results:
+        curves = result["curves"]
+        print(f"\n{result['chunk']} + {result['embedding']}: {result['queries']} queries, "
+              f"embed {result['embed_seconds']:.2f}s, query {result['query_seconds']:.3f}s")
+        print(f"{'k':>4} {'hit':>7} {'mrr':>7} {'recall':>7} {'ndcg':>7}")
+        for k in [k for k in REPORTED_KS if k < result["max_k"]] + [result["max_k"]]:
+            print(f"{k:>4} {curves['hit_rate'][k - 1]:>7.3f} {curves['mrr'][k - 1]:>7.3f} "
+                  f"{curves['recall'][k - 1]:>7.3f} {curves['ndcg'][k - 1]:>7.3f}")
\ No newline at end of file
@@ -1,19 +1,26 @@
 import os
-import json
 from tqdm import tqdm
-from data_ingestion import load_corpus
+from data_ingestion import load_corpus, load_changed_articles
 from chunking import TextChunker
 from vector_store import VectorStore
 from agent import Agent
-from evaluation import Evaluator, load_evaluation_dataset, save_results
-from config import CHUNK_CONFIGS, EMBEDDING_CONFIGS, MEMORY_CONFIGS, VECTOR_STORE_DIR, RESULTS_DIR, EXPERIMENT_SEED
+from memory import LongTermMemory
+from graph_prebuild import prebuild_entity_graph
+from evaluation import get_evaluator, load_evaluation_dataset
+from results_log import ResultsLog
+from tracing import export_traces
+from resilience import get_resilience_metrics, resilience_delta
+from profiling import profiled
+from config import VECTOR_STORE_DIR, RESULTS_DIR, EXPERIMENT_SEED, PREBUILD_ENTITY_GRAPH
+from config import TRACE_DIR, TRACE_EXPORT_FORMAT, EVAL_CONCURRENCY, EXPERIMENT_WORKERS, RESULTS_CHECKPOINT_BATCH
 import random
 import numpy as np
 
 random.seed(EXPERIMENT_SEED)
 np.random.seed(EXPERIMENT_SEED)
 
-def ingest_corpus(corpus, chunk_config, embedding_config, collection_name):
+@profiled("ingest")
+def chunk_corpus(corpus, chunk_config):
     chunker = TextChunker(
         strategy=chunk_config["strategy"],
         chunk_size=chunk_config["size"],
@@ -30,7 +37,10 @@ def ingest_corpus(corpus, chunk_config, embedding_config, collection_name):
         all_chunks.extend(chunks)
     
     print(f"Total chunks created: {len(all_chunks)}")
-    
+    return all_chunks
+
+@profiled("ingest")
+def build_vector_store(chunks, embedding_config, collection_name):
     persist_dir = os.path.join(VECTOR_STORE_DIR, collection_name)
     vector_store = VectorStore(
         collection_name=collection_name,
@@ -39,78 +49,184 @@ def ingest_corpus(corpus, chunk_config, embedding_config, collection_name):
     )
     
     if vector_store.count() == 0:
-        vector_store.add_documents(all_chunks)
-    else:
+        vector_store.add_documents(chunks)
+    elif vector_store.is_current(chunks):
         print(f"Collection {collection_name} already has {vector_store.count()} documents")
+    else:
+        changed = [article["title"] for article in load_changed_articles()]
+        if changed:
+            print(f"Corpus changed since {collection_name} was built: {', '.join(changed)}")
+        embedded = vector_store.sync_documents(chunks)
+        print(f"Collection {collection_name} is up to date with {vector_store.count()} documents ({embedded} embedded)")
     
     return vector_store
 
-def run_single_experiment(config_name, chunk_config, embedding_config, memory_config, evaluation_dataset):
+def collection_name_for(config_name, chunk_config):
+    return f"{config_name}_{chunk_config['strategy']}_{chunk_config['size']}"
+
+@profiled("ingest")
+def ingest_corpus(corpus, chunk_config, embedding_config, collection_name, prebuild_graph=PREBUILD_ENTITY_GRAPH, ltm=None):
+    all_chunks = chunk_corpus(corpus, chunk_config)
+    vector_store = build_vector_store(all_chunks, embedding_config, collection_name)
+    
+    if prebuild_graph:
+        marker = f"{chunk_config['strategy']}_{chunk_config['size']}_{chunk_config['overlap']}"
+        prebuild_entity_graph(all_chunks, ltm or LongTermMemory(), marker=marker)
+    
+    return vector_store
+
+@profiled("experiment")
+def run_single_experiment(config_name, chunk_config, embedding_config, memory_config, evaluation_dataset,
+                          vector_store=None, ltm=None, rate_limiter=None, results_log=None):
+    """
+    Answer and score the evaluation dataset with one configuration.
+    
+    The corpus is ingested here unless a ready `vector_store` is given; `ltm` and
+    `rate_limiter` let the experiment planner give each experiment its own LTM
+    database and a share of the API limits. With a `results_log`, queries already
+    logged for this experiment are skipped, each scored batch of
+    RESULTS_CHECKPOINT_BATCH queries is appended to the log instead of being kept
+    in memory, and metrics are aggregated from the log.
+    """
     print(f"\n{'='*60}")
     print(f"Running experiment: {config_name}")
     print(f"{'='*60}")
     
-    corpus = load_corpus()
-    
-    collection_name = f"{config_name}_{chunk_config['strategy']}_{chunk_config['size']}"
+    # Callers are shared process-wide, so only what this experiment adds to their counters is reported
+    resilience_start = get_resilience_metrics()
     
-    vector_store = ingest_corpus(corpus, chunk_config, embedding_config, collection_name)
+    if vector_store is None:
+        corpus = load_corpus()
+        vector_store = ingest_corpus(corpus, chunk_config, embedding_config, collection_name_for(config_name, chunk_config))
     
-    agent = Agent(vector_store=vector_store, use_stm=memory_config["use_stm"], use_ltm=memory_config["use_ltm"])
+    agent = Agent(
+        vector_store=vector_store,
+        use_stm=memory_config["use_stm"],
+        use_ltm=memory_config["use_ltm"],
+        ltm=ltm,
+        rate_limiter=rate_limiter
+    )
     
-    evaluator = Evaluator()
+    evaluator = get_evaluator()
     
     # Determine chunking key for ground truth lookup
     chunking_key = f"{chunk_config['strategy']}_{chunk_config['size']}"
     
+    pending = evaluation_dataset
+    completed = set()
+    if results_log:
+        completed = results_log.completed_questions(config_name)
+        pending = [item for item in evaluation_dataset if item["question"] not in completed]
+        if completed:
+            print(f"Resuming {config_name}: {len(evaluation_dataset) - len(pending)} queries already logged")
+    
     results = []
+    traces = []
+    trace_path = None
+    if TRACE_EXPORT_FORMAT:
+        extension = "jsonl" if TRACE_EXPORT_FORMAT == "jsonl" else "json"
+        trace_path = os.path.join(TRACE_DIR, f"{config_name}.{extension}")
     
-    for item in tqdm(evaluation_dataset, desc="Evaluating queries"):
-        question = item["question"]
-        reference_answer = item["reference_answer"]
-        
-        # Get gold chunk IDs for this specific chunking strategy
-        gold_chunk_ids = item.get("gold_chunk_ids", {}).get(chunking_key, [])
-        
-        response = agent.answer(question)
+    # Every query starts from an empty STM, so they can be answered concurrently
+    print(f"Answering {len(pending)} queries with concurrency {EVAL_CONCURRENCY}")
+    progress = tqdm(total=len(pending), desc="Evaluating queries")
+    
+    for start in range(0, len(pending), RESULTS_CHECKPOINT_BATCH):
+        batch = pending[start:start + RESULTS_CHECKPOINT_BATCH]
+        responses = agent.answer_many([item["question"] for item in batch], concurrency=EVAL_CONCURRENCY)
         
-        retrieval_metrics = evaluator.evaluate_retrieval_quality(
-            response["retrieved_chunks"],
-            gold_chunk_ids
+        all_answer_metrics = evaluator.evaluate_answer_quality_batch(
+            [response["answer"] for response in responses],
+            [item["reference_answer"] for item in batch]
         )
         
-        answer_metrics = evaluator.evaluate_answer_quality(
-            response["answer"],
-            reference_answer
-        )
+        for item, response, answer_metrics in zip(batch, responses, all_answer_metrics):
+            # Get gold chunk IDs for this specific chunking strategy
+            gold_chunk_ids = item.get("gold_chunk_ids", {}).get(chunking_key, [])
+            
+            retrieval_metrics = evaluator.evaluate_retrieval_quality(
+                response["retrieved_chunks"],
+                gold_chunk_ids
+            )
+            
+            result = {
+                "question": item["question"],
+                "reference_answer": item["reference_answer"],
+                "generated_answer": response["answer"],
+                "retrieval_metrics": retrieval_metrics,
+                "answer_metrics": answer_metrics,
+                "latency": response["latency"],
+                "tokens_in": response["tokens_in"],
+                "tokens_out": response["tokens_out"],
+                "cached": response.get("cached", False),
+                "stage_latencies": response.get("stage_latencies", {})
+            }
+            
+            if results_log:
+                results_log.append_query(config_name, result)
+            else:
+                results.append(result)
+            
+            if trace_path and response.get("trace"):
+                traces.append(response["trace"])
         
-        results.append({
-            "question": question,
-            "reference_answer": reference_answer,
-            "generated_answer": response["answer"],
-            "retrieval_metrics": retrieval_metrics,
-            "answer_metrics": answer_metrics,
-            "latency": response["latency"],
-            "tokens_in": response["tokens_in"],
-            "tokens_out": response["tokens_out"]
-        })
+        # jsonl spans are written per batch; a Chrome trace is one document, so it is written at the end
+        if TRACE_EXPORT_FORMAT == "jsonl" and traces:
+            # Only a fresh run starts the file over; a resumed one adds to the interrupted run's spans
+            export_traces(traces, trace_path, TRACE_EXPORT_FORMAT, append=start > 0 or bool(completed))
+            traces = []
         
-        agent.reset_session()
+        progress.update(len(batch))
+    
+    progress.close()
+    agent.close()
+    
+    if results_log:
+        results = results_log.query_results(config_name)
     
     aggregated_metrics = evaluator.aggregate_metrics(results)
     
+    if agent.answer_cache:
+        aggregated_metrics["answer_cache"] = agent.get_answer_cache_stats()
+    
+    aggregated_metrics["resilience"] = resilience_delta(resilience_start, agent.get_resilience_metrics())
+    
+    if traces:
+        export_traces(traces, trace_path, TRACE_EXPORT_FORMAT, append=bool(completed))
+    
     experiment_result = {
         "config_name": config_name,
         "chunk_config": chunk_config,
         "embedding_config": embedding_config,
         "memory_config": memory_config,
-        "results": results,
+        "num_queries": len(results),
         "aggregated_metrics": aggregated_metrics
     }
     
+    if not results_log:
+        experiment_result["results"] = results
+    
     return experiment_result
 
-def run_all_experiments():
+EXPERIMENTS = [
+    # A: chunk size
+    {"config_name": "exp_a_small_fixed", "chunk": "small_fixed", "embedding": "small", "memory": "stm_ltm"},
+    {"config_name": "exp_a_large_fixed", "chunk": "large_fixed", "embedding": "small", "memory": "stm_ltm"},
+    # B: chunking strategy
+    {"config_name": "exp_b_small_fixed", "chunk": "small_fixed", "embedding": "small", "memory": "stm_ltm"},
+    {"config_name": "exp_b_recursive", "chunk": "recursive", "embedding": "small", "memory": "stm_ltm"},
+    # C: embedding model
+    {"config_name": "exp_c_small", "chunk": "small_fixed", "embedding": "small", "memory": "stm_ltm"},
+    {"config_name": "exp_c_large", "chunk": "small_fixed", "embedding": "large", "memory": "stm_ltm"},
+    # D: memory policy
+    {"config_name": "exp_d_stm_only", "chunk": "small_fixed", "embedding": "small", "memory": "stm_only"},
+    {"config_name": "exp_d_stm_ltm", "chunk": "small_fixed", "embedding": "small", "memory": "stm_ltm"}
+]
+
+def run_all_experiments(workers=EXPERIMENT_WORKERS, resume=False):
+    # Imported here because experiment_planner builds its stages from this module's functions
+    from experiment_planner import ExperimentPlanner
+    
     evaluation_dataset = load_evaluation_dataset()
     
     if not evaluation_dataset:
@@ -119,77 +235,23 @@ def run_all_experiments():
     
     print(f"Loaded {len(evaluation_dataset)} evaluation queries")
     
-    all_experiment_results = []
-    
-    print("\n" + "="*60)
-    print("EXPERIMENT A: Chunk Size Comparison")
-    print("="*60)
-    
-    for chunk_name in ["small_fixed", "large_fixed"]:
-        config_name = f"exp_a_{chunk_name}"
-        result = run_single_experiment(
-            config_name=config_name,
-            chunk_config=CHUNK_CONFIGS[chunk_name],
-            embedding_config=EMBEDDING_CONFIGS["small"],
-            memory_config=MEMORY_CONFIGS["stm_ltm"],
-            evaluation_dataset=evaluation_dataset
-        )
-        all_experiment_results.append(result)
-    
-    print("\n" + "="*60)
-    print("EXPERIMENT B: Chunking Strategy Comparison")
-    print("="*60)
-    
-    for chunk_name in ["small_fixed", "recursive"]:
-        config_name = f"exp_b_{chunk_name}"
-        result = run_single_experiment(
-            config_name=config_name,
-            chunk_config=CHUNK_CONFIGS[chunk_name],
-            embedding_config=EMBEDDING_CONFIGS["small"],
-            memory_config=MEMORY_CONFIGS["stm_ltm"],
-            evaluation_dataset=evaluation_dataset
-        )
-        all_experiment_results.append(result)
-    
-    print("\n" + "="*60)
-    print("EXPERIMENT C: Embedding Model Comparison")
-    print("="*60)
+    results_log = ResultsLog()
+    results_log.start(resume=resume)
     
-    for embedding_name in ["small", "large"]:
-        config_name = f"exp_c_{embedding_name}"
-        result = run_single_experiment(
-            config_name=config_name,
-            chunk_config=CHUNK_CONFIGS["small_fixed"],
-            embedding_config=EMBEDDING_CONFIGS[embedding_name],
-            memory_config=MEMORY_CONFIGS["stm_ltm"],
-            evaluation_dataset=evaluation_dataset
-        )
-        all_experiment_results.append(result)
-    
-    print("\n" + "="*60)
-    print("EXPERIMENT D: Memory Policy Comparison")
-    print("="*60)
-    
-    for memory_name in ["stm_only", "stm_ltm"]:
-        config_name = f"exp_d_{memory_name}"
-        result = run_single_experiment(
-            config_name=config_name,
-            chunk_config=CHUNK_CONFIGS["small_fixed"],
-            embedding_config=EMBEDDING_CONFIGS["small"],
-            memory_config=MEMORY_CONFIGS[memory_name],
-            evaluation_dataset=evaluation_dataset
-        )
-        all_experiment_results.append(result)
+    planner = ExperimentPlanner(EXPERIMENTS, evaluation_dataset, workers=workers, results_log=results_log, resume=resume)
+    planner.run()
     
     results_file = os.path.join(RESULTS_DIR, "all_experiments.json")
-    save_results(all_experiment_results, results_file)
+    order = [experiment["config_name"] for experiment in EXPERIMENTS]
+    results_log.export_json(results_file, order=order)
     
     print("\n" + "="*60)
     print("ALL EXPERIMENTS COMPLETED")
     print("="*60)
+    print(f"Results log: {results_log.path}")
     print(f"Results saved to: {results_file}")
     
-    return all_experiment_results
+    return list(results_log.summaries(order=order))
 
 if __name__ == "__main__":
     results = run_all_experiments()
\ No newline at end of file
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from http import HTTPStatus
+import numpy as np
+from agent import Agent
+from memory import ShortTermMemory, LongTermMemory
+from llm_client import create_async_openai_client, get_standin_transport
+from config import (
+    OPENAI_BACKEND, TOP_K_RETRIEVAL, LTM_DB_PATH, CHUNK_CONFIGS, EMBEDDING_CONFIGS,
+    SERVE_HOST, SERVE_PORT, SERVE_MAX_CONCURRENCY, SERVE_MAX_SESSIONS, SERVE_LTM_POOL_SIZE,
+    SERVE_CHUNK_CONFIG, SERVE_EMBEDDING_CONFIG, SERVE_METRICS_WINDOW, SERVE_MAX_BODY_BYTES
+)
+
+class BadRequest(Exception):
+    pass
+
+class AgentServer:
+    """
+    Minimal asyncio HTTP/1.1 service around one shared Agent.
+    
+    Every request goes through the same vector store, pooled LTM connections and
+    HTTP client. Each session_id gets its own STM, kept in an LRU of at most
+    `max_sessions` sessions, and requests within one session run one at a time.
+    At most `max_concurrency` answers are generated at once; the rest wait.
+    """
+    
+    def __init__(self, agent, host=SERVE_HOST, port=SERVE_PORT, max_concurrency=SERVE_MAX_CONCURRENCY,
+                 max_sessions=SERVE_MAX_SESSIONS):
+        self.agent = agent
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.max_sessions = max_sessions
+        
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._sessions = OrderedDict()
+        self._started_at = time.time()
+        self._in_flight = 0
+        self._waiting = 0
+        self._counters = {"requests": 0, "answers": 0, "cached_answers": 0, "client_errors": 0, "errors": 0,
+                          "sessions_evicted": 0}
+        self._latencies = deque(maxlen=SERVE_METRICS_WINDOW)
+        self._queue_waits = deque(maxlen=SERVE_METRICS_WINDOW)
+    
+    async def serve(self):
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"Serving agent on http://{self.host}:{self.port} (max concurrency {self.max_concurrency})")
+        
+        async with server:
+            await server.serve_forever()
+    
+    async def handle(self, method, path, body=b""):
+        """Route one request and return (status, payload)."""
+        self._counters["requests"] += 1
+        path = path.split("?", 1)[0]
+        
+        try:
+            if method == "GET" and path == "/health":
+                return 200, self.health()
+            if method == "GET" and path == "/metrics":
+                return 200, self.metrics()
+            if method == "POST" and path == "/answer":
+                return await self._answer(body)
+            if method == "DELETE" and path.startswith("/sessions/"):
+                removed = self._sessions.pop(path[len("/sessions/"):], None) is not None
+                return 200, {"removed": removed}
+            self._counters["client_errors"] += 1
+            return 404, {"error": f"No route for {method} {path}"}
+        except BadRequest as e:
+            self._counters["client_errors"] += 1
+            return 400, {"error": str(e)}
+        except Exception as e:
+            self._counters["errors"] += 1
+            print(f"Error handling {method} {path}: {e}")
+            return 500, {"error": str(e)}
+    
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_seconds": time.time() - self._started_at,
+            "documents": self.agent.vector_store.count(),
+            "backend": OPENAI_BACKEND
+        }
+    
+    def metrics(self):
+        metrics = {
+            **self._counters,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "sessions": len(self._sessions),
+            "latency": _percentiles(self._latencies),
+            "queue_wait": _percentiles(self._queue_waits),
+            "rate_limiter": self.agent.get_rate_limit_metrics(),
+            "resilience": self.agent.get_resilience_metrics(),
+            "ltm_pool": self.agent.ltm.get_pool_stats() if self.agent.ltm else {},
+            "ltm_write_behind": self.agent.get_write_behind_metrics(),
+            "answer_cache": self.agent.get_answer_cache_stats()
+        }
+        
+        if OPENAI_BACKEND == "standin":
+            metrics["standin"] = get_standin_transport().get_stats()
+        return metrics
+    
+    async def _answer(self, body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            # Covers invalid JSON and bodies that are not UTF-8
+            raise BadRequest("Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise BadRequest("Request body must be a JSON object")
+        
+        question = payload.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise BadRequest("'question' must be a non-empty string")
+        
+        top_k = payload.get("top_k", TOP_K_RETRIEVAL)
+        if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+            raise BadRequest("'top_k' must be a positive integer")
+        
+        session_id = payload.get("session_id") or uuid.uuid4().hex
+        if not isinstance(session_id, str):
+            raise BadRequest("'session_id' must be a string")
+        session = self._session(session_id)
+        
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        waiting = True
+        
+        try:
+            async with session["lock"], self._semaphore:
+                self._waiting -= 1
+                waiting = False
+                self._in_flight += 1
+                queue_wait = time.perf_counter() - queued_at
+                
+                try:
+                    response = await self.agent.aanswer(question, top_k=top_k, stm=session["stm"])
+                finally:
+                    self._in_flight -= 1
+        finally:
+            # A request cancelled while queued never reached the semaphore
+            if waiting:
+                self._waiting -= 1
+        
+        self._counters["answers"] += 1
+        if response.get("cached"):
+            self._counters["cached_answers"] += 1
+        self._latencies.append(response["latency"])
+        self._queue_waits.append(queue_wait)
+        
+        return 200, {
+            "session_id": session_id,
+            "answer": response["answer"],
+            "sources": [
+                {"id": chunk["id"], "title": chunk["metadata"].get("title", "Unknown"), "distance": chunk["distance"]}
+                for chunk in response["retrieved_chunks"]
+            ],
+            "tokens_in": response["tokens_in"],
+            "tokens_out": response["tokens_out"],
+            "latency": response["latency"],
+            "queue_wait": queue_wait,
+            "cached": response.get("cached", False),
+            "stage_latencies": response.get("stage_latencies", {})
+        }
+    
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        
+        if session is None:
+            session = {"stm": ShortTermMemory(), "lock": asyncio.Lock()}
+            self._sessions[session_id] = session
+            
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._counters["sessions_evicted"] += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        
+        return session
+    
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as e:
+                    _write_response(writer, 400, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                
+                if request is None:
+                    break
+                
+                method, path, headers, body = request
+                status, payload = await self.handle(method, path, body)
+                
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+def ingest_serving_corpus(ltm=None):
+    """Build (or load) the serving collection and prebuild the entity graph into `ltm` (default: the serving LTM)."""
+    # Imported here so the serve mode does not pull in the experiment stack at import time
+    from run_experiments import ingest_corpus
+    from data_ingestion import load_corpus
+    
+    chunk_config = CHUNK_CONFIGS[SERVE_CHUNK_CONFIG]
+    embedding_config = EMBEDDING_CONFIGS[SERVE_EMBEDDING_CONFIG]
+    
+    # Stand-in embeddings are not comparable with real ones, so each backend gets its own collection
+    collection_name = f"serve_{OPENAI_BACKEND}_{SERVE_EMBEDDING_CONFIG}_{chunk_config['strategy']}_{chunk_config['size']}"
+    return ingest_corpus(load_corpus(), chunk_config, embedding_config, collection_name, ltm=ltm)
+
+def build_server(host=SERVE_HOST, port=SERVE_PORT, max_concurrency=SERVE_MAX_CONCURRENCY, ltm_path=LTM_DB_PATH,
+                 vector_store=None):
+    ltm = LongTermMemory(ltm_path, pool_size=SERVE_LTM_POOL_SIZE)
+    if vector_store is None:
+        vector_store = ingest_serving_corpus(ltm)
+    
+    async_client = create_async_openai_client(max_connections=max_concurrency * 2)
+    vector_store.embedding_generator.async_client = async_client
+    
+    agent = Agent(
+        vector_store,
+        use_stm=True,
+        use_ltm=True,
+        async_client=async_client,
+        ltm=ltm
+    )
+    
+    return AgentServer(agent, host=host, port=port, max_concurrency=max_concurrency)
+
+def serve(host=SERVE_HOST, port=SERVE_PORT, max_concurrency=SERVE_MAX_CONCURRENCY):
+    server = build_server(host=host, port=port, max_concurrency=max_concurrency)
+    
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("Shutting down")
+    finally:
+        server.agent.close()
+        server.agent.ltm.close()
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise ValueError("Malformed request line")
+    method, path, _ = parts
+    
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    
+    length = int(headers.get("content-length", "0"))
+    if length > SERVE_MAX_BODY_BYTES:
+        raise ValueError(f"Request body larger than {SERVE_MAX_BODY_BYTES} bytes")
+    
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+def _write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+def _percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    
+    values = np.array(samples)
+    return {
+        "count": len(values),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max())
+    }
\ No newline at end of file
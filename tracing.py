@@ -0,0 +1,168 @@
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from config import TRACING_ENABLED
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Trace:
+    """
+    Spans recorded while answering one request.
+    
+    The active trace is carried in a context variable, so spans opened in
+    asyncio tasks and in asyncio.to_thread workers attach to the request that
+    started them.
+    """
+    
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+    
+    def next_span_id(self):
+        with self._lock:
+            return next(self._ids)
+    
+    def add_span(self, name, start, end, span_id=None, parent_id=None, attributes=None, error=None):
+        span_record = {
+            "span_id": span_id if span_id is not None else self.next_span_id(),
+            "parent_id": parent_id,
+            "name": name,
+            "start": start - self.start,
+            "duration": end - start,
+            "thread_id": threading.get_ident(),
+            "attributes": attributes or {}
+        }
+        if error:
+            span_record["error"] = error
+        
+        with self._lock:
+            self.spans.append(span_record)
+    
+    def stage_latencies(self):
+        """Total seconds spent in each span name; nested spans are included in their parents."""
+        stages = {}
+        with self._lock:
+            for span_record in self.spans:
+                stages[span_record["name"]] = stages.get(span_record["name"], 0.0) + span_record["duration"]
+        return stages
+    
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "wall_start": self.wall_start,
+            "spans": spans
+        }
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def use_trace(trace):
+    """Make `trace` the active trace for the enclosed block."""
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+@contextmanager
+def start_trace(name):
+    if not TRACING_ENABLED:
+        yield None
+        return
+    
+    with use_trace(Trace(name)) as trace:
+        yield trace
+
+@contextmanager
+def span(name, **attributes):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    
+    span_id = trace.next_span_id()
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    error = None
+    start = time.perf_counter()
+    
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        trace.add_span(name, start, end, span_id=span_id, parent_id=parent_id,
+                       attributes=attributes, error=error)
+
+def traced(name):
+    """Decorator that wraps a function or coroutine function in a span."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def export_traces(traces, path, trace_format="jsonl", append=False):
+    """Write traces as one JSON span per line ("jsonl") or as a Chrome trace file ("chrome"); `append` adds to an existing file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    if trace_format == "jsonl":
+        with open(path, 'a' if append else 'w', encoding='utf-8') as f:
+            for trace in traces:
+                for span_record in trace["spans"]:
+                    f.write(json.dumps({"trace_id": trace["trace_id"], "trace": trace["name"], **span_record}) + "\n")
+    elif trace_format == "chrome":
+        events = []
+        if append and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                events = json.load(f)["traceEvents"]
+        for trace in traces:
+            for span_record in trace["spans"]:
+                events.append({
+                    "name": span_record["name"],
+                    "cat": trace["name"],
+                    "ph": "X",
+                    "ts": (trace["wall_start"] + span_record["start"]) * 1e6,
+                    "dur": span_record["duration"] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": span_record["thread_id"],
+                    "args": {"trace_id": trace["trace_id"], **span_record["attributes"]}
+                })
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    else:
+        raise ValueError(f"Unknown trace format: {trace_format}")
+    
+    print(f"Exported {len(traces)} traces to {path}")
\ No newline at end of file
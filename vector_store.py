@@ -2,10 +2,14 @@ import chromadb
 from chromadb.config import Settings
 import os
 import json
+import asyncio
+import numpy as np
 from embeddings import EmbeddingGenerator
+from chunking import chunks_hash
+from tracing import traced, span
 
 class VectorStore:
-    def __init__(self, collection_name, persist_directory, embedding_config):
+    def __init__(self, collection_name, persist_directory, embedding_config, embedding_generator=None):
         self.collection_name = collection_name
         self.persist_directory = persist_directory
         self.embedding_config = embedding_config
@@ -20,7 +24,7 @@ class VectorStore:
             )
         )
         
-        self.embedding_generator = EmbeddingGenerator(
+        self.embedding_generator = embedding_generator or EmbeddingGenerator(
             model=embedding_config["model"],
             dimensions=embedding_config.get("dimensions")
         )
@@ -35,11 +39,10 @@ class VectorStore:
             )
             print(f"Created new collection: {collection_name}")
     
-    def add_documents(self, chunks):
+    def add_documents(self, chunks, embeddings=None):
         ids = []
         documents = []
         metadatas = []
-        embeddings = []
         
         texts_to_embed = []
         
@@ -50,8 +53,9 @@ class VectorStore:
             metadatas.append(chunk["metadata"])
             texts_to_embed.append(chunk["text"])
         
-        print(f"Generating embeddings for {len(texts_to_embed)} chunks...")
-        embeddings = self.embedding_generator.generate(texts_to_embed)
+        if embeddings is None:
+            print(f"Generating embeddings for {len(texts_to_embed)} chunks...")
+            embeddings = self.embedding_generator.generate(texts_to_embed)
         
         print(f"Adding {len(ids)} documents to vector store...")
         self.collection.add(
@@ -60,12 +64,88 @@ class VectorStore:
             metadatas=metadatas,
             embeddings=embeddings
         )
+        self._set_chunks_hash(chunks_hash(documents))
         
         print(f"Successfully added {len(ids)} documents")
     
-    def search(self, query, top_k=5, filters=None):
-        query_embedding = self.embedding_generator.generate(query)
+    def is_current(self, chunks):
+        """Whether the collection was built from exactly these chunk texts."""
+        metadata = self.collection.metadata or {}
+        return metadata.get("chunks_hash") == chunks_hash([chunk["text"] for chunk in chunks])
+    
+    def sync_documents(self, chunks):
+        """
+        Replace the collection's documents with `chunks`, embedding only texts it does not hold yet.
+        
+        Chunk IDs are positions across the whole sorted corpus, so a changed
+        article shifts the ID of every chunk after it; the collection is rebuilt
+        rather than patched, reusing stored embeddings for unchanged texts.
+        Returns the number of texts embedded.
+        """
+        stored = self.collection.get(include=["documents", "embeddings"])
+        texts = [chunk["text"] for chunk in chunks]
+        
+        if dict(zip(stored["ids"], stored["documents"])) == {f"chunk_{i}": text for i, text in enumerate(texts)}:
+            # Built before collections recorded their hash
+            self._set_chunks_hash(chunks_hash(texts))
+            return 0
+        
+        known = dict(zip(stored["documents"], np.asarray(stored["embeddings"]).tolist()))
+        new_texts = list(dict.fromkeys(text for text in texts if text not in known))
+        
+        if new_texts:
+            print(f"Generating embeddings for {len(new_texts)} new or changed chunks...")
+            embeddings = self.embedding_generator.generate(new_texts)
+            known.update(zip(new_texts, [embeddings] if len(new_texts) == 1 else embeddings))
+        
+        self.reset()
+        self.add_documents(chunks, embeddings=[known[text] for text in texts])
+        return len(new_texts)
+    
+    @traced("vector_store.search")
+    def search(self, query, top_k=5, filters=None, query_embedding=None):
+        if query_embedding is None:
+            query_embedding = self.embedding_generator.generate(query)
         
+        with span("vector_store.query"):
+            results = self.collection.query(**self._query_kwargs(query_embedding, top_k, filters))
+        
+        return self._format_results(results)
+    
+    @traced("vector_store.search")
+    async def asearch(self, query, top_k=5, filters=None, query_embedding=None):
+        if query_embedding is None:
+            query_embedding = await self.embedding_generator.agenerate(query)
+        
+        # Chroma's client is synchronous; run the query on a worker thread
+        with span("vector_store.query"):
+            results = await asyncio.to_thread(
+                self.collection.query, **self._query_kwargs(query_embedding, top_k, filters)
+            )
+        
+        return self._format_results(results)
+    
+    @traced("vector_store.search_batch")
+    def search_batch(self, queries, top_k=5, filters=None, query_embeddings=None):
+        """Embed all queries in one request and run them as one Chroma query; returns one result list per query."""
+        if query_embeddings is None:
+            query_embeddings = self.embedding_generator.generate(list(queries))
+            if len(queries) == 1:
+                query_embeddings = [query_embeddings]
+        
+        kwargs = {
+            "query_embeddings": list(query_embeddings),
+            "n_results": top_k
+        }
+        if filters:
+            kwargs["where"] = filters
+        
+        with span("vector_store.query"):
+            results = self.collection.query(**kwargs)
+        
+        return [self._format_results(results, index) for index in range(len(results["ids"]))]
+    
+    def _query_kwargs(self, query_embedding, top_k, filters):
         kwargs = {
             "query_embeddings": [query_embedding],
             "n_results": top_k
@@ -74,15 +154,16 @@ class VectorStore:
         if filters:
             kwargs["where"] = filters
         
-        results = self.collection.query(**kwargs)
-        
+        return kwargs
+    
+    def _format_results(self, results, index=0):
         retrieved_chunks = []
-        for i in range(len(results["ids"][0])):
+        for i in range(len(results["ids"][index])):
             retrieved_chunks.append({
-                "id": results["ids"][0][i],
-                "text": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": results["distances"][0][i]
+                "id": results["ids"][index][i],
+                "text": results["documents"][index][i],
+                "metadata": results["metadatas"][index][i],
+                "distance": results["distances"][index][i]
             })
         
         return retrieved_chunks
@@ -90,6 +171,9 @@ class VectorStore:
     def count(self):
         return self.collection.count()
     
+    def _set_chunks_hash(self, value):
+        self.collection.modify(metadata={"embedding_config": json.dumps(self.embedding_config), "chunks_hash": value})
+    
     def reset(self):
         self.client.delete_collection(name=self.collection_name)
         self.collection = self.client.create_collection(
@@ -3,14 +3,19 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import os
-from config import RESULTS_DIR
+from results_log import ResultsLog
+from config import RESULTS_DIR, RESULTS_LOG_PATH
 
 sns.set_style("whitegrid")
 sns.set_palette("husl")
 
 def load_results(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        results = json.load(f)
+    
+    for result in results:
+        result.setdefault("num_queries", len(result["results"]))
+    return results
 
 def plot_chunk_size_comparison(results, output_dir):
     exp_a_results = [r for r in results if r["config_name"].startswith("exp_a_")]
@@ -29,7 +34,7 @@ def plot_chunk_size_comparison(results, output_dir):
             "MRR": metrics["retrieval"]["mrr_mean"],
             "Semantic Similarity": metrics["answer_quality"]["semantic_similarity_mean"],
             "Latency (s)": metrics["latency"]["p50"],
-            "Cost ($)": metrics["cost"]["estimated_total_usd"] / len(result["results"])
+            "Cost ($)": metrics["cost"]["estimated_total_usd"] / result["num_queries"]
         })
     
     df = pd.DataFrame(data)
@@ -121,7 +126,7 @@ def plot_embedding_comparison(results, output_dir):
         models.append(model)
         hit_rates.append(metrics["retrieval"]["hit_rate_mean"])
         similarities.append(metrics["answer_quality"]["semantic_similarity_mean"])
-        costs.append(metrics["cost"]["estimated_total_usd"] / len(result["results"]))
+        costs.append(metrics["cost"]["estimated_total_usd"] / result["num_queries"])
     
     fig, axes = plt.subplots(1, 3, figsize=(15, 4))
     fig.suptitle("Experiment C: Embedding Model Comparison", fontsize=16, fontweight='bold')
@@ -203,7 +208,7 @@ def generate_summary_table(results, output_dir):
             "MRR": f"{metrics['retrieval']['mrr_mean']:.3f}",
             "Similarity": f"{metrics['answer_quality']['semantic_similarity_mean']:.3f}",
             "Latency (s)": f"{metrics['latency']['p50']:.3f}",
-            "Cost ($)": f"{metrics['cost']['estimated_total_usd'] / len(result['results']):.6f}"
+            "Cost ($)": f"{metrics['cost']['estimated_total_usd'] / result['num_queries']:.6f}"
         })
     
     df = pd.DataFrame(data)
@@ -236,12 +241,15 @@ def generate_summary_table(results, output_dir):
 def visualize_all_results():
     results_file = os.path.join(RESULTS_DIR, "all_experiments.json")
     
-    if not os.path.exists(results_file):
+    # The results log is the source of truth; all_experiments.json is only read for runs that predate it
+    if os.path.exists(RESULTS_LOG_PATH):
+        results = list(ResultsLog(RESULTS_LOG_PATH).summaries())
+    elif os.path.exists(results_file):
+        results = load_results(results_file)
+    else:
         print(f"Results file not found: {results_file}")
         return
     
-    results = load_results(results_file)
-    
     plots_dir = os.path.join(RESULTS_DIR, "plots")
     os.makedirs(plots_dir, exist_ok=True)
     
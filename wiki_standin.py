@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from config import WIKI_STANDIN_DIR
+
+class WikiStandIn:
+    """
+    Local replacement for the MediaWiki query API, serving pages from JSON files.
+    
+    Each file in `directory` holds one article shaped like a corpus file
+    ("title", "url", "content") with an optional "revision_id"; without one the
+    revision is derived from the content, so editing a file shows up as a new
+    revision. Files are re-read on every request, and `latency` seconds are
+    slept per request to stand in for the network.
+    """
+    
+    def __init__(self, directory=WIKI_STANDIN_DIR, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "pages": 0, "extracts": 0}
+        
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.json'):
+                path = os.path.join(directory, filename)
+                self._paths[_read(path)["title"]] = path
+    
+    def request(self, params):
+        """Answer a query for `titles` with the revisions, extracts and info (URL) props."""
+        time.sleep(self.latency)
+        props = params.get("prop", "").split("|")
+        pages = {}
+        extracts = 0
+        
+        for i, title in enumerate(params["titles"].split("|")):
+            path = self._paths.get(title)
+            if path is None or not os.path.exists(path):
+                pages[str(-1 - i)] = {"title": title, "missing": ""}
+                continue
+            
+            article = _read(path)
+            page_id = int(hashlib.sha256(article["title"].encode("utf-8")).hexdigest()[:8], 16)
+            revision_id = article.get("revision_id") or int(
+                hashlib.sha256(article["content"].encode("utf-8")).hexdigest()[:8], 16
+            )
+            
+            page = {"pageid": page_id, "title": article["title"]}
+            if "revisions" in props:
+                page["revisions"] = [{"revid": revision_id}]
+            if "extracts" in props:
+                page["extract"] = article["content"]
+                extracts += 1
+            if "info" in props:
+                page["fullurl"] = article["url"]
+            pages[str(page_id)] = page
+        
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["pages"] += len(pages)
+            self._stats["extracts"] += extracts
+        return {"query": {"pages": pages}}
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
\ No newline at end of file